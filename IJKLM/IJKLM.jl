@@ -8,16 +8,37 @@ function read_tuple_list(filename)
     return [tuple(x...) for x in JSON.parsefile(filename)]
 end
 
-function read_fixed_data()
+function read_column_list(filename)
+    # little-endian int32 columns written by help.save_to_columns
+    meta = JSON.parsefile("$filename.meta.json")
+    rows = meta["rows"]
+    dims = meta["dims"]
+    codes = Vector{Int32}(undef, rows * length(dims))
+    read!("$filename.bin", codes)
+    codes = reshape(ltoh.(codes), rows, length(dims))
+    labels = [
+        ["$(meta["labels"][d][1])$x" for x in 1:meta["labels"][d][2]] for d in dims
+    ]
+    return [Tuple(labels[c][codes[r, c]+1] for c in eachindex(dims)) for r in 1:rows]
+end
+
+function read_symbol(name, format)
+    if format == "bin"
+        return read_column_list("IJKLM/data/data_$name")
+    end
+    return read_tuple_list("IJKLM/data/data_$name.json")
+end
+
+function read_fixed_data(format)
     N = open(JSON.parse, "IJKLM/data/data_N.json")
-    JKL = read_tuple_list("IJKLM/data/data_JKL.json")
-    KLM = read_tuple_list("IJKLM/data/data_KLM.json")
+    JKL = read_symbol("JKL", format)
+    KLM = read_symbol("KLM", format)
     return N, JKL, KLM
 end
 
-function read_variable_data(n)
+function read_variable_data(n, format)
     I = ["i$i" for i in 1:n]
-    IJK = read_tuple_list("IJKLM/data/data_IJK_$n.json")
+    IJK = read_symbol("IJK_$n", format)
     return I, IJK
 end
 
@@ -80,53 +101,82 @@ function fast_jump(I, IJK, JKL, KLM, solve)
     end
 end
 
+# worker mode: one cell per command of the python driver, see jump_worker.jl
+include(joinpath(@__DIR__, "..", "jump_worker.jl"))
+
+# data of the last n, the JuMP cells of an n follow each other
+loaded = Dict{String,Any}()
+
+function run_cell(command)
+    n, format, solve = command["n"], command["format"], command["solve"]
+    if get(loaded, "key", nothing) != (n, format)
+        _, JKL, KLM = read_fixed_data(format)
+        I, IJK = read_variable_data(n, format)
+        loaded["key"] = (n, format)
+        loaded["data"] = (I, IJK, JKL, KLM)
+    end
+    f = command["language"] == "Fast JuMP" ? fast_jump : jump
+    return benchmark_cell(
+        command["language"], n, solve, command["samples"], command["evals"],
+        f, loaded["data"]..., solve,
+    )
+end
+
 # standalone 
 # solve = false
 # samples = 2
 # evals = 1
 # time_limit = 5
+# format = "json"
 
 # call from python
-solve = ARGS[1]
-samples = parse(Int64, ARGS[2])
-evals = parse(Int64, ARGS[3])
-time_limit = parse(Int64, ARGS[4])
-
-N, JKL, KLM = read_fixed_data()
-
-t = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[])
-tt = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[])
-
-for n in N
-    I, IJK = read_variable_data(n)
-
-    if maximum(t.MinTime; init=0) < time_limit
-        r = @benchmark fast_jump($I, $IJK, $JKL, $KLM, $solve) samples = samples evals = evals
-        push!(t, (n, "Fast JuMP", minimum(r.times) / 1e9, mean(r.times) / 1e9, median(r.times) / 1e9))
-        println("Fast JuMP done $n in $(round(minimum(r.times) / 1e9, digits=2))s")
+if length(ARGS) >= 1 && ARGS[1] == "worker"
+    serve(run_cell)
+else
+    solve = ARGS[1]
+    samples = parse(Int64, ARGS[2])
+    evals = parse(Int64, ARGS[3])
+    time_limit = parse(Int64, ARGS[4])
+    format = length(ARGS) >= 5 ? ARGS[5] : "json"
+
+    N, JKL, KLM = read_fixed_data(format)
+
+    # peak RSS of the julia process so far and memory allocated per evaluation (MiB),
+    # and the raw samples (s)
+    t = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[], ProcessPeakMemory=Float64[], AllocatedMemory=Float64[], Times=Vector{Float64}[])
+    tt = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[], ProcessPeakMemory=Float64[], AllocatedMemory=Float64[], Times=Vector{Float64}[])
+
+    for n in N
+        I, IJK = read_variable_data(n, format)
+
+        if maximum(t.MinTime; init=0) < time_limit
+            r = @benchmark fast_jump($I, $IJK, $JKL, $KLM, $solve) samples = samples evals = evals
+            push!(t, (n, "Fast JuMP", minimum(r.times) / 1e9, mean(r.times) / 1e9, median(r.times) / 1e9, Sys.maxrss() / 2^20, r.memory / 2^20, r.times / 1e9))
+            println("Fast JuMP done $n in $(round(minimum(r.times) / 1e9, digits=2))s")
+        end
+
+        if maximum(tt.MinTime; init=0) < time_limit
+            rr = @benchmark jump($I, $IJK, $JKL, $KLM, $solve) samples = samples evals = evals
+            push!(tt, (n, "JuMP", minimum(rr.times) / 1e9, mean(rr.times) / 1e9, median(rr.times) / 1e9, Sys.maxrss() / 2^20, rr.memory / 2^20, rr.times / 1e9))
+            println("JuMP done $n in $(round(minimum(rr.times) / 1e9, digits=2))s")
+        end
     end
 
-    if maximum(tt.MinTime; init=0) < time_limit
-        rr = @benchmark jump($I, $IJK, $JKL, $KLM, $solve) samples = samples evals = evals
-        push!(tt, (n, "JuMP", minimum(rr.times) / 1e9, mean(rr.times) / 1e9, median(rr.times) / 1e9))
-        println("JuMP done $n in $(round(minimum(rr.times) / 1e9, digits=2))s")
+    if solve == "True"
+        file = "IJKLM/results/fast_jump_results_solve.json"
+        file2 = "IJKLM/results/jump_results_solve.json"
+    else
+        file = "IJKLM/results/fast_jump_results_model.json"
+        file2 = "IJKLM/results/jump_results_model.json"
     end
-end
 
-if solve == "True"
-    file = "IJKLM/results/fast_jump_results_solve.json"
-    file2 = "IJKLM/results/jump_results_solve.json"
-else
-    file = "IJKLM/results/fast_jump_results_model.json"
-    file2 = "IJKLM/results/jump_results_model.json"
-end
+    open(file, "w") do f
+        JSON.print(f, t, 4)
+    end
 
-open(file, "w") do f
-    JSON.print(f, t, 4)
-end
+    open(file2, "w") do f
+        JSON.print(f, tt, 4)
+    end
 
-open(file2, "w") do f
-    JSON.print(f, tt, 4)
+    println("JuMP done")
 end
-
-println("JuMP done")
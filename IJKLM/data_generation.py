@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from collections import defaultdict
 
+from index_set import IndexSet, Labels, create_labels
+
 
 ########## Data ##########
 def create_fixed_data(m):
@@ -64,3 +66,81 @@ def fixed_data_to_dicts(JKL, KLM):
     for k, l, m in KLM:
         KLM_dict[k, l].append(m)
     return JKL_dict, KLM_dict
+
+
+########## Sparse Data ##########
+def draw_sparse_product(rng, shape, p):
+    # draw the flat positions of the Bernoulli(p) hits of the product directly
+    # from their geometric gaps instead of drawing a value for every cell
+    size = int(np.prod(shape))
+    chunks = []
+    last = -1
+    while True:
+        remaining = size - last - 1
+        batch = int(remaining * p + 5 * np.sqrt(remaining * p) + 16)
+        positions = last + np.cumsum(rng.geometric(p, size=batch))
+        if positions[-1] >= size:
+            chunks.append(positions[positions < size])
+            break
+        chunks.append(positions)
+        last = positions[-1]
+    flat = np.concatenate(chunks)
+    return np.stack(np.unravel_index(flat, shape), axis=1).astype(np.int32)
+
+
+def create_sparse_fixed_data(m, seed=None):
+    rng = np.random.default_rng(seed)
+
+    labels = create_labels("jklm", m)
+
+    jkl = IndexSet(("j", "k", "l"), draw_sparse_product(rng, (m, m, m), 0.05), labels)
+    klm = IndexSet(("k", "l", "m"), draw_sparse_product(rng, (m, m, m), 0.05), labels)
+
+    return labels, jkl, klm
+
+
+def iter_sparse_variable_blocks(labels, seed=None, block_size=1000):
+    # draw IJK block by block of block_size products; every block gets its own
+    # random stream, so the first blocks never depend on the later ones
+    seeds = np.random.SeedSequence(seed)
+    shape = (block_size, len(labels["j"]), len(labels["k"]))
+    start = 0
+    while True:
+        ijk = draw_sparse_product(np.random.default_rng(seeds.spawn(1)[0]), shape, 0.05)
+        ijk[:, 0] += start
+        yield ijk
+        start += block_size
+
+
+def stream_sparse_variable_data(N, labels, seed=None, block_size=1000):
+    # yield (n, IJK) for the increasing sizes in N; the instance for n is the
+    # prefix i < n of every larger instance, so each step only draws new blocks
+    blocks = iter_sparse_variable_blocks(labels, seed, block_size)
+    buffer = np.empty((0, 3), dtype=np.int32)
+    rows = drawn = 0
+    for n in N:
+        while drawn < n:
+            block = next(blocks)
+            if rows + len(block) > len(buffer):
+                # grow geometrically; earlier instances keep their old buffer
+                grown = np.empty((2 * (rows + len(block)), 3), dtype=np.int32)
+                grown[:rows] = buffer[:rows]
+                buffer = grown
+            buffer[rows : rows + len(block)] = block
+            rows += len(block)
+            drawn += block_size
+
+        end = np.searchsorted(buffer[:rows, 0], n)
+        yield n, IndexSet(("i", "j", "k"), buffer[:end], dict(labels, i=Labels("i", n)))
+
+
+def prefix_variable_data(N, ijk):
+    # yield (n, IJK) for the sizes in N as prefix views of a larger instance
+    for n in N:
+        end = np.searchsorted(ijk.column("i"), n)
+        yield n, IndexSet(ijk.dims, ijk.codes[:end], dict(ijk.labels, i=Labels("i", n)))
+
+
+def create_sparse_variable_data(n, labels, seed=None, block_size=1000):
+    ((_, ijk),) = stream_sparse_variable_data([n], labels, seed, block_size)
+    return ijk
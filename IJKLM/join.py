@@ -0,0 +1,61 @@
+import numpy as np
+
+from index_set import IndexSet, group_rows, match_rows
+
+
+########## Join Index ##########
+def pair_key(a, b, size_b):
+    return a.astype(np.int64) * size_b + b
+
+
+def build_join_index(JKL, KLM):
+    labels = dict(JKL.labels, **KLM.labels)
+    nj, nk, nl = (len(labels[d]) for d in "jkl")
+
+    # index JKL on (j, k) and KLM on (k, l)
+    jk = pair_key(JKL.column("j"), JKL.column("k"), nk)
+    kl = pair_key(KLM.column("k"), KLM.column("l"), nl)
+
+    return {
+        "labels": labels,
+        "jkl": (JKL.column("l"), *group_rows(jk, nj * nk)),
+        "klm": (KLM.column("m"), *group_rows(kl, nk * nl)),
+    }
+
+
+def expand(keys, index):
+    # repeat every row once per match of its key and return the matched codes
+    values, order, indptr = index
+    rows, matches = match_rows(keys, (order, indptr))
+    return rows, values[matches]
+
+
+########## Expansion ##########
+def join(IJK, index):
+    labels = dict(index["labels"], i=IJK.labels["i"])
+    nk, nl = len(labels["k"]), len(labels["l"])
+    i, j, k = (IJK.column(d) for d in "ijk")
+
+    # IJK ⋈ JKL on (j, k)
+    rows, l = expand(pair_key(j, k, nk), index["jkl"])
+    i, j, k = i[rows], j[rows], k[rows]
+
+    # IJKL ⋈ KLM on (k, l)
+    rows, m = expand(pair_key(k, l, nl), index["klm"])
+    i, j, k, l = i[rows], j[rows], k[rows], l[rows]
+
+    # group the expanded rows by i
+    order, indptr = group_rows(i, len(labels["i"]))
+    x = IndexSet(("i", "j", "k", "l", "m"), np.stack([i, j, k, l, m], 1)[order], labels)
+
+    return x, indptr
+
+
+def x_groups(x, indptr):
+    # {i: [(i, j, k, l, m), ...]} for every i, including the empty ones
+    x_list = x.to_tuples()
+    bounds = indptr.tolist()
+    return {
+        i: x_list[bounds[n] : bounds[n + 1]]
+        for n, i in enumerate(x.labels["i"].tolist())
+    }
@@ -3,21 +3,27 @@ import subprocess
 import pandas as pd
 import numpy as np
 
+from gams_instance import run_gams_instance
+
 
 ########## GAMS ##########
-def data_to_gams(I, J, K, L, M, ijk, jkl, klm):
+def data_to_gams(IJK, JKL, KLM):
+    # one GDX per sweep with the data of the largest n, the cells restrict the
+    # model to their first n products (--N); the records are categoricals on
+    # the integer codes of the index sets, so no labels are built per row
     c = gt.Container()
+    labels = dict(IJK.labels, **JKL.labels, **KLM.labels)
 
-    # create sets
-    i = c.addSet("i", records=I)
-    j = c.addSet("j", records=J)
-    k = c.addSet("k", records=K)
-    l = c.addSet("l", records=L)
-    m = c.addSet("m", records=M)
+    # create sets, i first so the order of its elements is the product order
+    i = c.addSet("i", records=labels["i"].array())
+    j = c.addSet("j", records=labels["j"].array())
+    k = c.addSet("k", records=labels["k"].array())
+    l = c.addSet("l", records=labels["l"].array())
+    m = c.addSet("m", records=labels["m"].array())
 
-    c.addSet("IJK", [i, j, k], records=ijk[ijk["value"] == 1])
-    c.addSet("JKL", [j, k, l], records=jkl[jkl["value"] == 1])
-    c.addSet("KLM", [k, l, m], records=klm[klm["value"] == 1])
+    c.addSet("IJK", [i, j, k], records=IJK.to_frame())
+    c.addSet("JKL", [j, k, l], records=JKL.to_frame())
+    c.addSet("KLM", [k, l, m], records=KLM.to_frame())
 
     # create parameter
     c.addParameter("time")
@@ -29,19 +35,18 @@ def data_to_gams(I, J, K, L, M, ijk, jkl, klm):
     c.write("IJKLM/data/data.gdx")
 
 
-def run_gams(solve, N, repeats, number):
+def run_gams(I, solve, repeats, number):
+    # the GDX of the sweep has to be written already (data_to_gams)
+    command = [
+        "gams",
+        "IJKLM/IJKLM.gms",
+        f"--N={len(I)}",
+        f"--R={repeats}",
+        f"--evals={number}",
+    ]
     if solve:
-        subprocess.call(
-            f"gams IJKLM/IJKLM.gms --solve={solve} --R={repeats} --N={number}",
-            stderr=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-        )
-    else:
-        subprocess.call(
-            f"gams IJKLM/IJKLM.gms --R={repeats} --N={number}",
-            stderr=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-        )
+        command.append(f"--solve={solve}")
+    subprocess.call(command, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
 
     c = gt.Container()
     c.read("IJKLM/results/result.gdx")
@@ -49,7 +54,7 @@ def run_gams(solve, N, repeats, number):
 
     result = pd.DataFrame(
         {
-            "I": [N],
+            "I": [len(I)],
             "Language": ["GAMS"],
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
@@ -58,3 +63,16 @@ def run_gams(solve, N, repeats, number):
     )
 
     return result
+
+
+def run_persistent_gams(I, solve, repeats, number):
+    # the model is compiled and the GDX of the sweep loaded once per process
+    return run_gams_instance(
+        "IJKLM/IJKLM.gms",
+        "IJKLM/data/data.gdx",
+        "mi minimizing z using lp",
+        len(I),
+        solve,
+        repeats,
+        number,
+    )
@@ -1,6 +1,7 @@
-import timeit
+import timing
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import gurobipy as gpy
 import itertools
 import operator
@@ -21,7 +22,7 @@ def run_gurobi(I, ijk, jkl, klm, solve, repeats, number):
         "solve": solve,
         "model_function": gurobi,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(I, IJK, JKL, KLM, solve)",
         repeat=repeats,
         number=number,
@@ -35,6 +36,7 @@ def run_gurobi(I, ijk, jkl, klm, solve, repeats, number):
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -43,37 +45,43 @@ def run_gurobi(I, ijk, jkl, klm, solve, repeats, number):
 def gurobi(I, IJK, JKL, KLM, solve):
     model = gpy.Model()
 
-    x_list = [
-        (i, j, k, l, m)
-        for (i, j, k) in IJK.select("*", "*", "*")
-        for (j, k, l) in JKL.select(j, k, "*")
-        for (k, l, m) in KLM.select(k, l, "*")
-    ]
-
-    x = model.addVars(x_list, name="x")
-
-    model.setObjective(1, gpy.GRB.MINIMIZE)
-
-    model.addConstrs(
-        (
-            gpy.quicksum(
-                x[i, j, k, l, m]
-                for (i, j, k) in IJK.select(i, "*", "*")
-                for (j, k, l) in JKL.select(j, k, "*")
-                for (k, l, m) in KLM.select(k, l, "*")
-            )
-            >= 0
-            for i in I
-        ),
-        "ei",
-    )
+    with timing.phase("data"):
+        x_list = [
+            (i, j, k, l, m)
+            for (i, j, k) in IJK.select("*", "*", "*")
+            for (j, k, l) in JKL.select(j, k, "*")
+            for (k, l, m) in KLM.select(k, l, "*")
+        ]
+
+    with timing.phase("variables"):
+        x = model.addVars(x_list, name="x")
+
+    with timing.phase("constraints"):
+        model.setObjective(1, gpy.GRB.MINIMIZE)
+
+        model.addConstrs(
+            (
+                gpy.quicksum(
+                    x[i, j, k, l, m]
+                    for (i, j, k) in IJK.select(i, "*", "*")
+                    for (j, k, l) in JKL.select(j, k, "*")
+                    for (k, l, m) in KLM.select(k, l, "*")
+                )
+                >= 0
+                for i in I
+            ),
+            "ei",
+        )
 
-    model.update()
+    # hand the pending changes to the Gurobi library
+    with timing.phase("writer"):
+        model.update()
 
     if solve:
-        model.Params.OutputFlag = 0
-        model.Params.TimeLimit = 0
-        model.optimize()
+        with timing.phase("solver"):
+            model.Params.OutputFlag = 0
+            model.Params.TimeLimit = 0
+            model.optimize()
 
 
 ########## Fast Gurobi ##########
@@ -91,7 +99,7 @@ def run_fast_gurobi(I, ijk, jkl, klm, solve, repeats, number):
         "solve": solve,
         "model_function": fast_gurobi,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(I, IJK, JKL, KLM, solve)",
         repeat=repeats,
         number=number,
@@ -105,6 +113,7 @@ def run_fast_gurobi(I, ijk, jkl, klm, solve, repeats, number):
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -113,33 +122,137 @@ def run_fast_gurobi(I, ijk, jkl, klm, solve, repeats, number):
 def fast_gurobi(I, IJK, JKL, KLM, solve):
     model = gpy.Model()
 
-    x_list = [
-        (i, j, k, l, m)
-        for (i, j, k) in IJK.select("*", "*", "*")
-        for (j, k, l) in JKL.select(j, k, "*")
-        for (k, l, m) in KLM.select(k, l, "*")
-    ]
+    with timing.phase("data"):
+        x_list = [
+            (i, j, k, l, m)
+            for (i, j, k) in IJK.select("*", "*", "*")
+            for (j, k, l) in JKL.select(j, k, "*")
+            for (k, l, m) in KLM.select(k, l, "*")
+        ]
+
+    with timing.phase("variables"):
+        x = model.addVars(x_list, name="x")
+
+    with timing.phase("data"):
+        constraint_dict_i = {i: [] for i in I}
+        constraint_dict_i.update(
+            {
+                i: list(j)
+                for i, j in itertools.groupby(sorted(x_list), operator.itemgetter(0))
+            }
+        )
+
+    build_fast_gurobi(model, I, x, constraint_dict_i, solve)
+
+
+def build_fast_gurobi(model, I, x, constraint_dict_i, solve):
+    with timing.phase("constraints"):
+        model.setObjective(1, gpy.GRB.MINIMIZE)
+
+        model.addConstrs(
+            (gpy.quicksum(x[ijklm] for ijklm in constraint_dict_i[i]) >= 0 for i in I),
+            "ei",
+        )
+
+    with timing.phase("writer"):
+        model.update()
+
+    if solve:
+        with timing.phase("solver"):
+            model.Params.OutputFlag = 0
+            model.Params.TimeLimit = 0
+            model.optimize()
+
 
-    x = model.addVars(x_list, name="x")
+########## Joined Gurobi ##########
+def run_joined_gurobi(I, X, X_I, solve, repeats, number):
+    setup = {
+        "I": I,
+        "X": X,
+        "X_I": X_I,
+        "solve": solve,
+        "model_function": joined_gurobi,
+    }
+    r, phases = timing.repeat(
+        "model_function(I, X, X_I, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
 
-    constraint_dict_i = {i: [] for i in I}
-    constraint_dict_i.update(
+    result = pd.DataFrame(
         {
-            i: list(j)
-            for i, j in itertools.groupby(sorted(x_list), operator.itemgetter(0))
+            "I": [len(I)],
+            "Language": ["Joined GurobiPy"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
+    return result
 
-    model.setObjective(1, gpy.GRB.MINIMIZE)
 
-    model.addConstrs(
-        (gpy.quicksum(x[ijklm] for ijklm in constraint_dict_i[i]) >= 0 for i in I),
-        "ei",
+def joined_gurobi(I, X, X_I, solve):
+    # same model as fast_gurobi, but with the precomputed join of IJK, JKL and KLM
+    model = gpy.Model()
+
+    with timing.phase("variables"):
+        x = model.addVars(X, name="x")
+
+    build_fast_gurobi(model, I, x, X_I, solve)
+
+
+########## Matrix Gurobi ##########
+def run_matrix_gurobi(I, X, X_indptr, solve, repeats, number):
+    # X: joined IndexSet sorted by i, X_indptr: offsets of the rows of every i
+    setup = {
+        "I": I,
+        "X": X,
+        "X_indptr": X_indptr,
+        "solve": solve,
+        "model_function": matrix_gurobi,
+    }
+    r, phases = timing.repeat(
+        "model_function(I, X, X_indptr, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
+
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Matrix GurobiPy"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
     )
+    return result
+
+
+def matrix_gurobi(I, X, X_indptr, solve):
+    model = gpy.Model()
+
+    with timing.phase("variables"):
+        x = model.addMVar(len(X), name="x")
+
+    with timing.phase("constraints"):
+        model.setObjective(1, gpy.GRB.MINIMIZE)
+
+        # one row per i over its slice of x, the rows of unused i stay empty
+        A = sp.csr_matrix(
+            (np.ones(len(X)), np.arange(len(X)), X_indptr), shape=(len(I), len(X))
+        )
+        model.addMConstr(A, x, gpy.GRB.GREATER_EQUAL, np.zeros(len(I)), name="ei")
 
-    model.update()
+    with timing.phase("writer"):
+        model.update()
 
     if solve:
-        model.Params.OutputFlag = 0
-        model.Params.TimeLimit = 0
-        model.optimize()
+        with timing.phase("solver"):
+            model.Params.OutputFlag = 0
+            model.Params.TimeLimit = 0
+            model.optimize()
@@ -1,12 +1,37 @@
 import pyomo.environ as pyo
+import pyomo.kernel as pmo
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+from pyomo.core.expr.numeric_expr import LinearExpression
 import logging
-import timeit
+import timing
 import pandas as pd
 import numpy as np
 import itertools, operator
 
 logging.getLogger("pyomo.core").setLevel(logging.ERROR)
 
+# where the solver interfaces write the LP file or build the solver model
+WRITER = ("_presolve", "set_instance")
+
+
+########## Solvers ##########
+def solver_interface(solver):
+    return timing.timed_method(pyo.SolverFactory(solver), WRITER, "writer")
+
+
+def solve_model(model, solver="gurobi", opt=None):
+    # solve with a new interface of solver, or with opt, a persistent
+    # interface created once per cell and reused by every repeat
+    with timing.phase("solver"):
+        if opt is None:
+            opt = solver_interface(solver)
+        if isinstance(opt, PersistentSolver):
+            # build the gurobipy model in memory, no LP file
+            opt.set_instance(model)
+            opt.solve(options={"TimeLimit": 0}, load_solutions=False)
+        else:
+            opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+
 
 ########## Pyomo ##########
 def run_pyomo(I, IJK, JKL, KLM, solve, repeats, number):
@@ -18,7 +43,7 @@ def run_pyomo(I, IJK, JKL, KLM, solve, repeats, number):
         "solve": solve,
         "model_function": pyomo,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(I, IJK, JKL, KLM, solve)",
         repeat=repeats,
         number=number,
@@ -32,6 +57,7 @@ def run_pyomo(I, IJK, JKL, KLM, solve, repeats, number):
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -40,32 +66,34 @@ def run_pyomo(I, IJK, JKL, KLM, solve, repeats, number):
 def pyomo(I, IJK, JKL, KLM, solve):
     model = pyo.ConcreteModel()
 
-    model.I = pyo.Set(initialize=I)
-    model.IJK = pyo.Set(initialize=IJK)
-    model.JKL = pyo.Set(initialize=JKL)
-    model.KLM = pyo.Set(initialize=KLM)
-
-    model.z = pyo.Param(default=1)
-
-    model.x = pyo.Var(
-        [
-            (i, j, k, l, m)
-            for (i, j, k) in model.IJK
-            for (jj, kk, l) in model.JKL
-            if (jj == j) and (kk == k)
-            for (kkk, ll, m) in model.KLM
-            if (kkk == k) and (ll == l)
-        ],
-        domain=pyo.NonNegativeReals,
-    )
+    with timing.phase("data"):
+        model.I = pyo.Set(initialize=I)
+        model.IJK = pyo.Set(initialize=IJK)
+        model.JKL = pyo.Set(initialize=JKL)
+        model.KLM = pyo.Set(initialize=KLM)
+
+        model.z = pyo.Param(default=1)
+
+    with timing.phase("variables"):
+        model.x = pyo.Var(
+            [
+                (i, j, k, l, m)
+                for (i, j, k) in model.IJK
+                for (jj, kk, l) in model.JKL
+                if (jj == j) and (kk == k)
+                for (kkk, ll, m) in model.KLM
+                if (kkk == k) and (ll == l)
+            ],
+            domain=pyo.NonNegativeReals,
+        )
 
-    model.OBJ = pyo.Objective(expr=model.z)
+    with timing.phase("constraints"):
+        model.OBJ = pyo.Objective(expr=model.z)
 
-    model.ei = pyo.Constraint(model.I, rule=ei_rule)
+        model.ei = pyo.Constraint(model.I, rule=ei_rule)
 
     if solve:
-        opt = pyo.SolverFactory("gurobi")
-        opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+        solve_model(model)
 
 
 def ei_rule(model, i):
@@ -94,7 +122,7 @@ def run_fast_pyomo(I, IJK, JKL, KLM, solve, repeats, number):
         "solve": solve,
         "model_function": fast_pyomo,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(I, IJK, JKL, KLM, solve)",
         repeat=repeats,
         number=number,
@@ -108,6 +136,7 @@ def run_fast_pyomo(I, IJK, JKL, KLM, solve, repeats, number):
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -116,40 +145,238 @@ def run_fast_pyomo(I, IJK, JKL, KLM, solve, repeats, number):
 def fast_pyomo(I, IJK, JKL, KLM, solve):
     model = pyo.ConcreteModel()
 
-    model.I = pyo.Set(initialize=I)
+    with timing.phase("data"):
+        model.I = pyo.Set(initialize=I)
 
-    x_list = [
-        (i, j, k, l, m) for (i, j, k) in IJK for l in JKL[j, k] for m in KLM[k, l]
-    ]
+        x_list = [
+            (i, j, k, l, m) for (i, j, k) in IJK for l in JKL[j, k] for m in KLM[k, l]
+        ]
+
+        constraint_dict_i = {i: [] for i in I}
+        constraint_dict_i.update(
+            {
+                i: list(j)
+                for i, j in itertools.groupby(sorted(x_list), operator.itemgetter(0))
+            }
+        )
+
+    build_fast_pyomo(model, x_list, constraint_dict_i, solve)
+
+
+def build_fast_pyomo(
+    model, x_list, constraint_dict_i, solve, rule=None, solver="gurobi", opt=None
+):
+    with timing.phase("data"):
+        model.x_list = pyo.Set(initialize=x_list)
+        model.c_dict_i = pyo.Set(model.I, initialize=constraint_dict_i)
+
+        model.z = pyo.Param(default=1)
+
+    with timing.phase("variables"):
+        model.x = pyo.Var(model.x_list, domain=pyo.NonNegativeReals)
+
+    with timing.phase("constraints"):
+        model.OBJ = pyo.Objective(expr=model.z)
+
+        model.ei = pyo.Constraint(model.I, rule=rule or fast_ei_rule)
+
+    if solve:
+        solve_model(model, solver, opt)
+
+
+def fast_ei_rule(model, i):
+    if not model.c_dict_i[i]:
+        return pyo.Constraint.Skip
+    return sum(model.x[idx] for idx in model.c_dict_i[i]) >= 0
+
+
+########## Joined Pyomo ##########
+def run_joined_pyomo(I, X, X_I, solve, repeats, number):
+    setup = {
+        "I": I,
+        "X": X,
+        "X_I": X_I,
+        "solve": solve,
+        "model_function": joined_pyomo,
+    }
+    r, phases = timing.repeat(
+        "model_function(I, X, X_I, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
 
-    constraint_dict_i = {i: [] for i in I}
-    constraint_dict_i.update(
+    result = pd.DataFrame(
         {
-            i: list(j)
-            for i, j in itertools.groupby(sorted(x_list), operator.itemgetter(0))
+            "I": [len(I)],
+            "Language": ["Joined Pyomo"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
+    return result
+
+
+def joined_pyomo(I, X, X_I, solve):
+    # same model as fast_pyomo, but with the precomputed join of IJK, JKL and KLM
+    model = pyo.ConcreteModel()
 
-    model.x_list = pyo.Set(initialize=x_list)
-    model.c_dict_i = pyo.Set(model.I, initialize=constraint_dict_i)
+    with timing.phase("data"):
+        model.I = pyo.Set(initialize=I)
 
-    model.z = pyo.Param(default=1)
+    build_fast_pyomo(model, X, X_I, solve)
 
-    model.x = pyo.Var(model.x_list, domain=pyo.NonNegativeReals)
 
-    model.OBJ = pyo.Objective(expr=model.z)
+########## Kernel Pyomo ##########
+def run_kernel_pyomo(I, X, X_I, solve, repeats, number):
+    setup = {
+        "I": I,
+        "X": X,
+        "X_I": X_I,
+        "solve": solve,
+        "model_function": kernel_pyomo,
+    }
+    r, phases = timing.repeat(
+        "model_function(I, X, X_I, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
+
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Kernel Pyomo"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
+    )
+    return result
 
-    model.ei = pyo.Constraint(model.I, rule=fast_ei_rule)
+
+def kernel_pyomo(I, X, X_I, solve):
+    # pyomo.kernel model with linear constraints given by their coefficients,
+    # so no expressions are generated; solved without the LP writer
+    model = pmo.block()
+
+    with timing.phase("variables"):
+        model.x = pmo.variable_dict((idx, pmo.variable(lb=0)) for idx in X)
+
+    with timing.phase("constraints"):
+        model.OBJ = pmo.objective(1)
+
+        model.ei = pmo.constraint_dict(
+            (
+                i,
+                pmo.linear_constraint(
+                    variables=[model.x[idx] for idx in X_I[i]],
+                    coefficients=[1] * len(X_I[i]),
+                    lb=0,
+                ),
+            )
+            for i in I
+            if X_I[i]
+        )
 
     if solve:
-        opt = pyo.SolverFactory("gurobi")
-        opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+        solve_model(model, "gurobi_direct")
 
 
-def fast_ei_rule(model, i):
+########## Linear Pyomo ##########
+def run_linear_pyomo(I, X, X_I, solve, repeats, number):
+    setup = {
+        "I": I,
+        "X": X,
+        "X_I": X_I,
+        "solve": solve,
+        "model_function": linear_pyomo,
+    }
+    r, phases = timing.repeat(
+        "model_function(I, X, X_I, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
+
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Linear Pyomo"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
+    )
+    return result
+
+
+def linear_pyomo(I, X, X_I, solve):
+    # same model as joined_pyomo, with LinearExpression rules and the appsi
+    # interface instead of the LP writer
+    model = pyo.ConcreteModel()
+
+    with timing.phase("data"):
+        model.I = pyo.Set(initialize=I)
+
+    build_fast_pyomo(model, X, X_I, solve, rule=linear_ei_rule, solver="appsi_gurobi")
+
+
+def linear_ei_rule(model, i):
     if not model.c_dict_i[i]:
         return pyo.Constraint.Skip
-    return sum(model.x[idx] for idx in model.c_dict_i[i]) >= 0
+    x = [model.x[idx] for idx in model.c_dict_i[i]]
+    return LinearExpression(constant=0, linear_coefs=[1] * len(x), linear_vars=x) >= 0
+
+
+########## Persistent Pyomo ##########
+def run_persistent_pyomo(I, X, X_I, solve, repeats, number, reuse=False):
+    # reuse: one persistent interface for all repeats of the cell
+    setup = {
+        "I": I,
+        "X": X,
+        "X_I": X_I,
+        "solve": solve,
+        "opt": solver_interface("gurobi_persistent") if solve and reuse else None,
+        "model_function": persistent_pyomo,
+    }
+    r, phases = timing.repeat(
+        "model_function(I, X, X_I, solve, opt)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
+
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Reused Persistent Pyomo" if reuse else "Persistent Pyomo"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
+    )
+    return result
+
+
+def run_reused_pyomo(*args, **kwargs):
+    return run_persistent_pyomo(*args, **kwargs, reuse=True)
+
+
+def persistent_pyomo(I, X, X_I, solve, opt=None):
+    # same model as joined_pyomo, handed to gurobi in memory by the persistent
+    # interface instead of through an LP file and the gurobi shell
+    model = pyo.ConcreteModel()
+
+    with timing.phase("data"):
+        model.I = pyo.Set(initialize=I)
+
+    build_fast_pyomo(model, X, X_I, solve, solver="gurobi_persistent", opt=opt)
 
 
 ########## Cartesian Pyomo ##########
@@ -166,7 +393,7 @@ def run_cartesian_pyomo(I, J, K, L, M, IJK, JKL, KLM, solve, repeats, number):
         "solve": solve,
         "model_function": cartesian_pyomo,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(I, J, K, L, M, IJK, JKL, KLM, solve)",
         repeat=repeats,
         number=number,
@@ -180,6 +407,7 @@ def run_cartesian_pyomo(I, J, K, L, M, IJK, JKL, KLM, solve, repeats, number):
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -188,30 +416,32 @@ def run_cartesian_pyomo(I, J, K, L, M, IJK, JKL, KLM, solve, repeats, number):
 def cartesian_pyomo(I, J, K, L, M, IJK, JKL, KLM, solve):
     model = pyo.ConcreteModel()
 
-    model.I = pyo.Set(initialize=I)
-    model.J = pyo.Set(initialize=J)
-    model.K = pyo.Set(initialize=K)
-    model.L = pyo.Set(initialize=L)
-    model.M = pyo.Set(initialize=M)
-    model.IJK = pyo.Set(initialize=IJK)
-    model.JKL = pyo.Set(initialize=JKL)
-    model.KLM = pyo.Set(initialize=KLM)
-
-    model.z = pyo.Param(default=1)
-
-    model.x = pyo.Var(
-        model.I,
-        model.J,
-        model.K,
-        model.L,
-        model.M,
-        domain=pyo.NonNegativeReals,
-    )
-
-    model.OBJ = pyo.Objective(expr=model.z)
-
-    model.ei = pyo.Constraint(model.I, rule=ei_rule)
+    with timing.phase("data"):
+        model.I = pyo.Set(initialize=I)
+        model.J = pyo.Set(initialize=J)
+        model.K = pyo.Set(initialize=K)
+        model.L = pyo.Set(initialize=L)
+        model.M = pyo.Set(initialize=M)
+        model.IJK = pyo.Set(initialize=IJK)
+        model.JKL = pyo.Set(initialize=JKL)
+        model.KLM = pyo.Set(initialize=KLM)
+
+        model.z = pyo.Param(default=1)
+
+    with timing.phase("variables"):
+        model.x = pyo.Var(
+            model.I,
+            model.J,
+            model.K,
+            model.L,
+            model.M,
+            domain=pyo.NonNegativeReals,
+        )
+
+    with timing.phase("constraints"):
+        model.OBJ = pyo.Objective(expr=model.z)
+
+        model.ei = pyo.Constraint(model.I, rule=ei_rule)
 
     if solve:
-        opt = pyo.SolverFactory("gurobi")
-        opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+        solve_model(model)
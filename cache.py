@@ -0,0 +1,118 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+from index_set import IndexSet, Labels
+
+
+########## Keys ##########
+def source_version(sources):
+    # hash of the generator code, so changing a generator invalidates its entries
+    h = hashlib.sha256()
+    for source in sources:
+        with open(source, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def cache_key(params, sources):
+    h = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    h.update(source_version(sources).encode())
+    return h.hexdigest()[:24]
+
+
+def cache_directory(model):
+    return os.path.join(model, "data", "cache")
+
+
+########## Storage ##########
+def save_sets(path, sets):
+    # one .npy per code matrix (and values), so entries can be memory-mapped
+    meta = {}
+    for name, s in sets.items():
+        np.save(os.path.join(path, f"{name}.npy"), s.codes)
+        if s.values is not None:
+            np.save(os.path.join(path, f"{name}.values.npy"), s.values)
+        meta[name] = {
+            "dims": s.dims,
+            "labels": {d: [s.labels[d].prefix, len(s.labels[d])] for d in s.dims},
+            "values": s.values is not None,
+        }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def load_sets(path, mmap_mode="r"):
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        meta = json.load(f)
+
+    # the sets of an entry share their label tables
+    labels = {}
+    sets = {}
+    for name, m in meta.items():
+        for d, (prefix, size) in m["labels"].items():
+            if d not in labels or len(labels[d]) != size:
+                labels[d] = Labels(prefix, size)
+        values = (
+            np.load(os.path.join(path, f"{name}.values.npy"), mmap_mode=mmap_mode)
+            if m["values"]
+            else None
+        )
+        sets[name] = IndexSet(
+            m["dims"],
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode),
+            {d: labels[d] for d in m["dims"]},
+            values,
+        )
+    return sets
+
+
+def entry_size(path):
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+
+def evict(model, max_bytes, keep=None):
+    # drop the least recently used entries until the cache fits into max_bytes
+    directory = cache_directory(model)
+    entries = [e.path for e in os.scandir(directory) if e.is_dir()]
+    entries = [p for p in entries if os.path.exists(os.path.join(p, "meta.json"))]
+    entries.sort(key=lambda p: os.path.getmtime(os.path.join(p, "meta.json")))
+
+    total = sum(entry_size(p) for p in entries)
+    for path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        total -= entry_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+########## Cache ##########
+def cached_sets(model, params, sources, create, max_bytes=2 * 1024**3):
+    # return the sets created by create() for params, generating them only once
+    directory = cache_directory(model)
+    path = os.path.join(directory, cache_key(dict(params, model=model), sources))
+
+    if os.path.exists(os.path.join(path, "meta.json")):
+        # mark the entry as recently used
+        os.utime(os.path.join(path, "meta.json"))
+        return load_sets(path)
+
+    sets = create()
+
+    # write to a temporary directory first so readers never see partial entries
+    os.makedirs(directory, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=directory, prefix=".tmp")
+    save_sets(tmp, sets)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # another process stored the same entry in the meantime
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    evict(model, max_bytes, keep=path)
+    return sets
@@ -1,9 +1,7 @@
-import pandas as pd
-import numpy as np
+from functools import partial
 
 # import submodules
 import IJKLM.data_generation as data
-import visualization
 from help import (
     create_directories,
     create_data_frame,
@@ -11,17 +9,33 @@ from help import (
     below_time_limit,
     process_results,
     print_log_message,
-    save_results,
 )
+from sweep import complete_cell
+from store import ResultStore, save_views
 
 from IJKLM.run_pyomo import run_cartesian_pyomo, run_pyomo
 
 
 ############## Experiment ##########################
 def run_experiment(
-    cardinality_of_i, cardinality_of_j, solve, repeats, number, time_limit
+    cardinality_of_i,
+    cardinality_of_j,
+    solve,
+    repeats,
+    number,
+    time_limit,
+    margin=1.5,
+    resume=False,
 ):
-    np.random.seed(13)
+    seed = 13
+    # every cell is recorded here as it completes, with the environment
+    store = ResultStore(
+        "cartesian_IJKLM",
+        solve,
+        {"cardinality_of_j": cardinality_of_j, "seed": seed},
+        resume=resume,
+    )
+    done = store.load(run=store.run) if resume else None
 
     # create empty frames for results
     df_pyomo = create_data_frame()
@@ -31,55 +45,71 @@ def run_experiment(
     N = list(incremental_range(5, cardinality_of_i + 1, 5, 5))
 
     # create fixed data and convert to tuples and dicts
-    J, K, L, M, JKL, KLM = data.create_fixed_data(m=cardinality_of_j)
-    jkl_tuple, klm_tuple = data.fixed_data_to_tuples(JKL=JKL, KLM=KLM)
+    labels, JKL, KLM = data.create_sparse_fixed_data(m=cardinality_of_j, seed=seed)
+    J, K, L, M = (labels[d].tolist() for d in "jklm")
+    jkl_tuple, klm_tuple = JKL.to_tuples(), KLM.to_tuples()
 
     # run experiment for every n in |I|
-    for n in N:
-        # create variable data and convert to tuples
-        I, IJK = data.create_variable_data(n=n, j=J, k=K)
-        ijk_tuple = data.variable_data_to_tuples(IJK=IJK)
+    instances = data.stream_sparse_variable_data(N=N, labels=labels, seed=seed)
+    for n, IJK in instances:
+        # convert variable data to tuples
+        I = IJK.labels["i"].tolist()
+        ijk_tuple = IJK.to_tuples()
 
         # Pyomo
         if below_time_limit(df_pyomo, time_limit):
-            rr = run_pyomo(
-                I=I,
-                IJK=ijk_tuple,
-                JKL=jkl_tuple,
-                KLM=klm_tuple,
-                solve=solve,
-                repeats=repeats,
-                number=number,
+            rr = complete_cell(
+                "Pyomo",
+                n,
+                df_pyomo,
+                time_limit,
+                margin,
+                store,
+                done,
+                partial(
+                    run_pyomo,
+                    I=I,
+                    IJK=ijk_tuple,
+                    JKL=jkl_tuple,
+                    KLM=klm_tuple,
+                    solve=solve,
+                    repeats=repeats,
+                    number=number,
+                ),
             )
             df_pyomo = process_results(rr, df_pyomo)
             print_log_message(language="Pyomo", n=n, df=df_pyomo)
 
         # Cartesian Pyomo
         if below_time_limit(df_cartesian_pyomo, time_limit):
-            rr = run_cartesian_pyomo(
-                I=I,
-                J=J,
-                K=K,
-                L=L,
-                M=M,
-                IJK=ijk_tuple,
-                JKL=jkl_tuple,
-                KLM=klm_tuple,
-                solve=solve,
-                repeats=repeats,
-                number=number,
+            rr = complete_cell(
+                "Cartesian Pyomo",
+                n,
+                df_cartesian_pyomo,
+                time_limit,
+                margin,
+                store,
+                done,
+                partial(
+                    run_cartesian_pyomo,
+                    I=I,
+                    J=J,
+                    K=K,
+                    L=L,
+                    M=M,
+                    IJK=ijk_tuple,
+                    JKL=jkl_tuple,
+                    KLM=klm_tuple,
+                    solve=solve,
+                    repeats=repeats,
+                    number=number,
+                ),
             )
             df_cartesian_pyomo = process_results(rr, df_cartesian_pyomo)
             print_log_message(language="Cartesian Pyomo", n=n, df=df_cartesian_pyomo)
 
-    # merge all results
-    df = pd.concat([df_pyomo, df_cartesian_pyomo]).reset_index(drop=True)
-
-    # save results
-    save_results(df, solve, "cartesian_IJKLM")
-
-    # plot results
-    visualization.plot_results(df, cardinality_of_j, solve, "cartesian_IJKLM")
+    # save results and plot them from the store
+    save_views(store)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+import os
+import json
+import math
+import argparse
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import matplotlib.pyplot as plt
+from scipy import stats
+
+from help import measured
+from store import ResultStore
+
+
+########## Comparison ##########
+def smallest_pvalue(n1, n2):
+    # two-sided Mann-Whitney U p-value of completely separated samples, e.g.
+    # 0.1 for 3 against 3 samples
+    return min(1.0, 2 / math.comb(n1 + n2, n1))
+
+
+def significance(base, head, alpha=0.05):
+    # two-sided Mann-Whitney U test of the raw samples of a cell in two runs,
+    # untested (nan) if there are too few samples to reach alpha at all
+    if not isinstance(base, list) or not isinstance(head, list):
+        return np.nan
+    if smallest_pvalue(len(base), len(head)) > alpha:
+        return np.nan
+    return stats.mannwhitneyu(base, head, alternative="two-sided").pvalue
+
+
+def compare_runs(base, head, alpha=0.05):
+    # speedup of head over base for every (language, n) measured in both runs;
+    # above 1 head is faster
+    keys = ["Language", "I"]
+    columns = keys + ["MinTime", "MedianTime", "Times"]
+    df = measured(base)[columns].merge(
+        measured(head)[columns], on=keys, suffixes=("Base", "Head")
+    )
+    df["Speedup"] = df["MinTimeBase"] / df["MinTimeHead"]
+    df["MedianSpeedup"] = df["MedianTimeBase"] / df["MedianTimeHead"]
+    df["PValue"] = [
+        significance(b, h, alpha) for b, h in zip(df["TimesBase"], df["TimesHead"])
+    ]
+    df["Change"] = np.select(
+        [
+            df["PValue"].isna(),
+            (df["PValue"] < alpha) & (df["MedianSpeedup"] > 1),
+            (df["PValue"] < alpha) & (df["MedianSpeedup"] < 1),
+        ],
+        ["untested", "faster", "slower"],
+        "same",
+    )
+    return df.drop(columns=["TimesBase", "TimesHead"]).sort_values(keys)
+
+
+def environment_changes(base, head):
+    # fingerprint entries that differ between the runs
+    base, head = json.loads(base), json.loads(head)
+    return {
+        key: (base.get(key), head.get(key))
+        for key in sorted(set(base) | set(head))
+        if base.get(key) != head.get(key)
+    }
+
+
+########## Views ##########
+def plot_comparison(df, solve, model):
+    sns.set_theme(
+        style="ticks",
+        rc={
+            "figure.dpi": 100,
+        },
+    )
+
+    if solve:
+        filename = f"solve_regression.png"
+    else:
+        filename = f"model_regression.png"
+
+    # speedup per cell, the significant changes as larger markers
+    plot = sns.relplot(
+        data=df,
+        x="I",
+        y="Speedup",
+        hue="Language",
+        size=df["Change"].isin(["faster", "slower"]),
+        sizes={True: 60, False: 15},
+        kind="scatter",
+        palette="muted",
+    )
+    for language, group in df.groupby("Language", sort=False):
+        plot.ax.plot(group["I"], group["Speedup"], alpha=0.4)
+    plot.ax.axhline(1, color="gray", linestyle="--")
+    plot.ax.set_yscale("log")
+
+    plot.fig.suptitle("Speedup of the new run (> 1 is faster)", size=15)
+    plot.fig.subplots_adjust(top=0.85)
+
+    plot.set(xlabel=r"$|\mathcal{I}|$", ylabel="Speedup")
+
+    plt.savefig(f"plots/{model}/{filename}", dpi=300)
+
+
+def compare(model, solve, base=None, head=None, alpha=0.05):
+    # compare two runs of the store of model, by default the last run with the
+    # run of the same experiment before it
+    store = ResultStore(model, solve, read_only=True)
+    runs = store.runs().set_index("Run")
+    head = runs.index[-1] if head is None else head
+    if base is None:
+        # the previous run of the same experiment (scaling or startup)
+        same = runs.index[runs["Params"] == runs.loc[head, "Params"]]
+        earlier = same[: same.get_loc(head)]
+        if len(earlier) == 0:
+            raise ValueError(f"{model} has no run to compare {head} with")
+        base = earlier[-1]
+
+    df = compare_runs(store.load(run=base), store.load(run=head), alpha)
+    if df.empty:
+        raise ValueError(f"runs {base} and {head} have no cells in common")
+
+    for key, (old, new) in environment_changes(
+        runs.loc[base, "Environment"], runs.loc[head, "Environment"]
+    ).items():
+        print(f"{key:<15} {old} -> {new}")
+
+    file = (
+        os.path.join(model, "results", "comparison_solve.csv")
+        if solve
+        else os.path.join(model, "results", "comparison_model.csv")
+    )
+    df.to_csv(file, index=False)
+    plot_comparison(df, solve, model)
+
+    untested = (df["Change"] == "untested").sum()
+    if untested:
+        print(
+            f"{untested} of {len(df)} cells have too few samples for a test at"
+            f" alpha={alpha} (e.g. 4 against 4 samples are needed for 0.05)"
+        )
+
+    changed = df[df["Change"].isin(["faster", "slower"])]
+    print(f"\n{base} -> {head}")
+    print(changed[["Language", "I", "Speedup", "PValue", "Change"]].to_string())
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="compare two stored runs of a benchmark"
+    )
+    parser.add_argument("model", choices=["IJKLM", "supply_chain", "cartesian_IJKLM"])
+    parser.add_argument("--solve", action="store_true")
+    parser.add_argument("--base", help="run id, the run before head by default")
+    parser.add_argument("--head", help="run id, the last run by default")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    args = parser.parse_args()
+
+    compare(args.model, args.solve, args.base, args.head, args.alpha)
@@ -0,0 +1,92 @@
+import os
+import shutil
+import platform
+import subprocess
+import functools
+from importlib import metadata
+
+# python distributions of the modelling stack, gamsapi follows the GAMS release
+PACKAGES = ("pyomo", "gurobipy", "gamsapi", "numpy", "pandas", "scipy")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+########## Probes ##########
+def output(command, timeout=120):
+    # stripped stdout of command, None if it is not available or fails
+    try:
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=ROOT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+def package_versions():
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def julia_versions():
+    # julia and JuMP of the julia found on the path
+    if shutil.which("julia") is None:
+        return {"julia": None, "jump": None}
+    versions = output(
+        [
+            "julia",
+            "-e",
+            'import JuMP; print(VERSION, " ", pkgversion(JuMP))',
+        ]
+    )
+    if versions is None:
+        return {"julia": output(["julia", "--version"]), "jump": None}
+    julia, jump = versions.split()
+    return {"julia": julia, "jump": jump}
+
+
+def git_commit():
+    commit = output(["git", "rev-parse", "HEAD"])
+    if commit is not None and output(["git", "status", "--porcelain", "-uno"]):
+        # uncommitted changes to tracked files
+        commit += "-dirty"
+    return commit
+
+
+########## Fingerprint ##########
+@functools.lru_cache(maxsize=None)
+def fingerprint():
+    # what a run was measured with, stored with every cell of it; computed
+    # once per process since asking julia for JuMP takes a few seconds
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        **package_versions(),
+        **julia_versions(),
+        "cpu": cpu_model(),
+        "cpus": os.cpu_count(),
+        "platform": platform.platform(),
+        "node": platform.node(),
+        "commit": git_commit(),
+    }
@@ -0,0 +1,119 @@
+import os
+import glob
+from contextlib import contextmanager
+import pandas as pd
+import numpy as np
+from gams import GamsWorkspace
+
+import timing
+
+
+########## Session ##########
+class GamsSession:
+    # GAMS workspace of this process with a compiled model: the model file is
+    # compiled up to its timing loop (--persistent) and the GDX of the sweep is
+    # loaded once into a checkpoint; the cells restart from it and generate
+    # their model as a GamsModelInstance, which is solved in this process.
+    # A process per cell (memory, isolate) would compile the model every time,
+    # so the drivers leave the series out of those modes
+
+    def __init__(self, script, data):
+        self.pid = os.getpid()
+        self.data = data
+        self.version = os.path.getmtime(data)
+        self.workspace = GamsWorkspace()
+        self.checkpoint = self.workspace.add_checkpoint()
+
+        options = self.workspace.add_options()
+        options.defines["GDXdata"] = os.path.abspath(data)
+        options.defines["persistent"] = "1"
+        job = self.workspace.add_job_from_file(os.path.abspath(script))
+        job.run(options, checkpoint=self.checkpoint)
+
+        # same solver options as the model file
+        self.options = self.workspace.add_options()
+        self.options.lp = "gurobi"
+        self.options.reslim = 0
+
+    @contextmanager
+    def restrict(self, n):
+        # checkpoint with the model restricted to the first n products, shared
+        # by the samples of a cell; its files are removed after the cell
+        checkpoint = self.workspace.add_checkpoint()
+        job = self.workspace.add_job_from_string(
+            f"sub(i) = ord(i) <= {n};", self.checkpoint
+        )
+        try:
+            job.run(checkpoint=checkpoint)
+            yield checkpoint
+        finally:
+            self.remove(job.name)
+            self.remove(checkpoint.name)
+
+    def remove(self, name):
+        # files of a job or a checkpoint in the scratch directory
+        directory = self.workspace.working_directory
+        for pattern in (name, f"{name}.*"):
+            for path in glob.glob(os.path.join(directory, pattern)):
+                os.remove(path)
+
+    def generate(self, checkpoint, model, solve):
+        # the instance is released at the end of the sample, like the models of
+        # the python builders
+        instance = checkpoint.add_modelinstance()
+        try:
+            instance.instantiate(model, options=self.options)
+            if solve:
+                with timing.phase("solver"):
+                    instance.solve()
+        finally:
+            instance.cleanup()
+
+
+# sessions of this process, by (script, data)
+sessions = {}
+
+
+def get_session(script, data):
+    key = (script, data)
+    session = sessions.get(key)
+    if (
+        session is None
+        or session.pid != os.getpid()
+        or session.version != os.path.getmtime(data)
+    ):
+        # a new sweep wrote the GDX, or a forked process starts its own session
+        session = sessions[key] = GamsSession(script, data)
+    return session
+
+
+########## Cells ##########
+def run_gams_instance(script, data, model, n, solve, repeats, number):
+    # one cell of the persistent GAMS series, model: the solve statement of the
+    # model file without "solve", e.g. "mi minimizing z using lp"
+    session = get_session(script, data)
+    with session.restrict(n) as checkpoint:
+        setup = {
+            "checkpoint": checkpoint,
+            "model": model,
+            "solve": solve,
+            "model_function": session.generate,
+        }
+        r, phases = timing.repeat(
+            "model_function(checkpoint, model, solve)",
+            repeat=repeats,
+            number=number,
+            globals=setup,
+        )
+
+    result = pd.DataFrame(
+        {
+            "I": [n],
+            "Language": ["GAMS (persistent)"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
+    )
+    return result
@@ -1,7 +1,12 @@
 import pandas as pd
+import numpy as np
 import os
 import json
 
+from timing import PHASE_COLUMNS, SAMPLE_COLUMNS
+from memory import MEMORY_COLUMNS, TRACE_COLUMNS
+from jump_worker import JULIA_COLUMNS
+
 
 def incremental_range(start, stop, step, inc):
     value = start
@@ -13,7 +18,19 @@ def incremental_range(start, stop, step, inc):
 
 def create_data_frame():
     return pd.DataFrame(
-        {"I": [], "Language": [], "MeanTime": [], "MedianTime": [], "MinTime": []}
+        {
+            "I": [],
+            "Language": [],
+            "MeanTime": [],
+            "MedianTime": [],
+            "MinTime": [],
+            "Censored": [],
+            **{column: [] for column in SAMPLE_COLUMNS},
+            **{column: [] for column in PHASE_COLUMNS},
+            **{column: [] for column in MEMORY_COLUMNS},
+            **{column: [] for column in TRACE_COLUMNS},
+            **{column: [] for column in JULIA_COLUMNS},
+        }
     )
 
 
@@ -35,10 +52,63 @@ def save_to_json_d(d, name, i, model):
     df.to_json(file, orient="values")
 
 
+def save_to_columns(symbol, name, i, model):
+    # integer codes as little-endian int32 columns plus a small label table
+    file = os.path.join(model, "data", f"data_{name}{i}")
+    symbol.codes.T.astype("<i4").tofile(f"{file}.bin")
+    if symbol.values is not None:
+        np.asarray(symbol.values, dtype="<f8").tofile(f"{file}.values.bin")
+    meta = {
+        "rows": len(symbol),
+        "dims": symbol.dims,
+        "labels": {
+            d: [symbol.labels[d].prefix, len(symbol.labels[d])] for d in symbol.dims
+        },
+        "values": symbol.values is not None,
+    }
+    with open(f"{file}.meta.json", "w") as f:
+        json.dump(meta, f)
+
+
 def below_time_limit(df, limit):
     return (df["MinTime"].max() < limit) or (df.empty)
 
 
+def is_censored(df):
+    # rows that were predicted instead of run
+    if "Censored" not in df:
+        return pd.Series(False, index=df.index)
+    return df["Censored"].eq(True)
+
+
+def measured(df):
+    return df[~is_censored(df)]
+
+
+def predict_time(df, n, points=3):
+    # power law t = a * n^b through the last measured points, None without two
+    df = measured(df).dropna(subset=["MinTime"])
+    df = df[df["MinTime"] > 0].tail(points)
+    if df["I"].nunique() < 2:
+        return None
+    b, a = np.polyfit(np.log(df["I"].astype(float)), np.log(df["MinTime"]), 1)
+    return float(np.exp(a + b * np.log(n)))
+
+
+def censored_result(df, language, n, limit, margin):
+    # row that records the predicted time of n instead of running it, if the
+    # prediction exceeds the limit by the margin factor (None otherwise); the
+    # prediction is above the limit, so below_time_limit stops the backend
+    if margin is None:
+        return None
+    predicted = predict_time(df, n)
+    if predicted is None or predicted < margin * limit:
+        return None
+    return pd.DataFrame(
+        {"I": [n], "Language": [language], "MinTime": [predicted], "Censored": [True]}
+    )
+
+
 def process_results(r, res_df):
     return pd.concat([res_df, r])
 
@@ -46,6 +116,8 @@ def process_results(r, res_df):
 def print_log_message(language, n, df):
     # define a standardized log
     log = "{language:<19} done {n:>6} in {time:>}s"
+    if is_censored(df.tail(1)).all():
+        log = "{language:<19} skip {n:>6} predicted {time:>}s"
     print(
         (
             log.format(
@@ -57,10 +129,43 @@ def print_log_message(language, n, df):
     )
 
 
+def pivot_columns(df, columns):
+    # the columns of the backends that record them as "<Language> <Column>",
+    # None if no backend records any of them
+    columns = [c for c in columns if c in df and df[c].notna().any()]
+    if not columns:
+        return None
+    breakdown = df.pivot(index="I", columns="Language", values=columns)
+    breakdown = breakdown.dropna(axis=1, how="all")
+    breakdown.columns = [
+        f"{language} {column}" for column, language in breakdown.columns
+    ]
+    return breakdown
+
+
 def save_results(df, solve, model):
     file = (
         os.path.join(model, "results", "experiment_results_solve.csv")
         if solve
         else os.path.join(model, "results", "experiment_results_model.csv")
     )
-    df.pivot(index="I", columns="Language", values="MinTime").to_csv(file)
+    # predicted times of the skipped cells as "<Language> PredictedTime"
+    censored = df[is_censored(df)]
+    df = measured(df)
+    results = df.pivot(index="I", columns="Language", values="MinTime")
+    if not censored.empty:
+        predicted = censored.pivot(index="I", columns="Language", values="MinTime")
+        predicted.columns = [f"{language} PredictedTime" for language in predicted]
+        results = results.join(predicted, how="outer")
+
+    # confidence intervals, phases, memory and compile latency of the backends
+    # that record them, then the top allocators of traced cells as text
+    for columns in (
+        ("CILower", "CIUpper", *PHASE_COLUMNS, *MEMORY_COLUMNS, *JULIA_COLUMNS),
+        TRACE_COLUMNS,
+    ):
+        breakdown = pivot_columns(df, columns)
+        if breakdown is not None:
+            results = results.join(breakdown)
+
+    results.to_csv(file)
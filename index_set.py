@@ -0,0 +1,195 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+
+########## Labels ##########
+class Labels:
+    # labels of one dimension ("i1", "i2", ...), only built when they are needed
+    def __init__(self, prefix, size):
+        self.prefix = prefix
+        self.size = size
+        self._array = None
+        self._codes = None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, code):
+        return f"{self.prefix}{code + 1}"
+
+    def array(self):
+        if self._array is None or len(self._array) != self.size:
+            self._array = np.array(
+                [f"{self.prefix}{x}" for x in range(1, self.size + 1)], dtype=object
+            )
+        return self._array
+
+    def tolist(self):
+        return self.array().tolist()
+
+    def codes(self):
+        # label -> code dictionary
+        if self._codes is None or len(self._codes) != self.size:
+            self._codes = {label: code for code, label in enumerate(self.array())}
+        return self._codes
+
+    def encode(self, labels):
+        codes = self.codes()
+        return np.fromiter((codes[x] for x in labels), dtype=np.int32)
+
+
+def create_labels(dims, size):
+    return {d: Labels(d, size) for d in dims}
+
+
+########## Index Sets ##########
+class IndexSet:
+    # tuple set stored as one int32 code column per dimension plus the labels
+    # of every dimension; the optional values are aligned with the rows
+    def __init__(self, dims, codes, labels, values=None):
+        self.dims = tuple(dims)
+        self.codes = np.ascontiguousarray(codes, dtype=np.int32).reshape(
+            -1, len(self.dims)
+        )
+        self.labels = {d: labels[d] for d in self.dims}
+        self.values = None if values is None else np.asarray(values)
+        self._tuples = None
+
+    @classmethod
+    def from_tuples(cls, dims, tuples, labels, values=None):
+        tuples = list(tuples)
+        codes = np.empty((len(tuples), len(dims)), dtype=np.int32)
+        for d, dim in enumerate(dims):
+            codes[:, d] = labels[dim].encode(x[d] for x in tuples)
+        return cls(dims, codes, labels, values)
+
+    @classmethod
+    def from_dict(cls, dims, d, labels):
+        return cls.from_tuples(dims, d.keys(), labels, values=list(d.values()))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def column(self, dim):
+        return self.codes[:, self.dims.index(dim)]
+
+    def label_columns(self):
+        return [
+            self.labels[d].array()[self.codes[:, n]] for n, d in enumerate(self.dims)
+        ]
+
+    ########## Adapters ##########
+    def to_tuples(self):
+        if self._tuples is None:
+            self._tuples = list(zip(*(c.tolist() for c in self.label_columns())))
+        return self._tuples
+
+    def to_tuplelist(self):
+        import gurobipy as gpy
+
+        return gpy.tuplelist(self.to_tuples())
+
+    def to_dict(self):
+        return dict(zip(self.to_tuples(), self.values.tolist()))
+
+    def to_frame(self, value_name="value"):
+        df = pd.DataFrame(
+            {
+                d: pd.Categorical.from_codes(
+                    self.codes[:, n], categories=self.labels[d].array()
+                )
+                for n, d in enumerate(self.dims)
+            }
+        )
+        if self.values is not None:
+            df[value_name] = self.values
+        return df
+
+
+########## Grouping ##########
+def composite_keys(index_set, dims):
+    # mixed radix key of the given dims, equal rows get equal keys
+    keys = np.zeros(len(index_set), dtype=np.int64)
+    for d in dims:
+        keys = keys * len(index_set.labels[d]) + index_set.column(d)
+    return keys
+
+
+def group_rows(keys, size):
+    # sort the rows by their key once and store the group offsets (CSR)
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=indptr[1:])
+    return order, indptr
+
+
+def match_rows(keys, index):
+    # pairs (row of keys, matching row of the grouped relation) for an index
+    # (order, indptr) from group_rows
+    order, indptr = index
+    starts = indptr[keys]
+    counts = indptr[keys + 1] - starts
+    rows = np.repeat(np.arange(len(keys)), counts)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rows, order[starts[rows] + offsets]
+
+
+def unique_rows(codes, shape):
+    # set semantics for a code matrix, the rows come back sorted
+    keys = np.unique(np.ravel_multi_index(tuple(codes.T), shape))
+    return np.stack(np.unravel_index(keys, shape), axis=1).astype(np.int32)
+
+
+def group_by(rows, keys):
+    # offsets of the rows matching every key on the dims of keys; keys that
+    # only occur in rows are appended, so every group of rows is reachable
+    row_keys = composite_keys(rows, keys.dims)
+    order = np.argsort(row_keys, kind="stable")
+    sorted_keys = row_keys[order]
+
+    key_keys = composite_keys(keys, keys.dims)
+    extra = np.setdiff1d(sorted_keys, key_keys)
+    if len(extra):
+        shape = tuple(len(keys.labels[d]) for d in keys.dims)
+        codes = np.stack(np.unravel_index(extra, shape), axis=1)
+        keys = IndexSet(keys.dims, np.concatenate([keys.codes, codes]), keys.labels)
+        key_keys = np.concatenate([key_keys, extra])
+
+    starts = np.searchsorted(sorted_keys, key_keys, "left")
+    ends = np.searchsorted(sorted_keys, key_keys, "right")
+    return keys, order, starts, ends
+
+
+class GroupView(Mapping):
+    # {key tuple: [row tuples]} on top of the offsets of group_by; the tuples
+    # are built once on first use and every group is a slice of them
+    def __init__(self, keys, rows):
+        self.row_set = rows
+        self.key_set, self.order, self.starts, self.ends = group_by(rows, keys)
+        self._groups = None
+        self._tuples = None
+
+    def prepare(self):
+        if self._groups is None:
+            rows = self.row_set
+            self._tuples = IndexSet(
+                rows.dims, rows.codes[self.order], rows.labels
+            ).to_tuples()
+            self._groups = dict(
+                zip(
+                    self.key_set.to_tuples(),
+                    zip(self.starts.tolist(), self.ends.tolist()),
+                )
+            )
+        return self
+
+    def __getitem__(self, key):
+        start, end = self.prepare()._groups[key]
+        return self._tuples[start:end]
+
+    def __iter__(self):
+        return iter(self.key_set.to_tuples())
+
+    def __len__(self):
+        return len(self.key_set)
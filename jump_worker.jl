@@ -0,0 +1,48 @@
+# persistent JuMP worker, included by the model scripts: reads one JSON command
+# per line from stdin and answers every command with one "@result <json>" line
+# on stdout, everything else on stdout (solver banners) is log
+using JSON
+using BenchmarkTools
+
+# (language, solve) already called in this process
+called = Set{Tuple{String,String}}()
+
+function benchmark_cell(language, n, solve, samples, evals, f, args...)
+    # the first call compiles f for these argument types, it is timed on its own
+    # so the samples below are the steady state
+    first_call = nothing
+    if !((language, solve) in called)
+        first_call = @elapsed f(args...)
+        push!(called, (language, solve))
+    end
+    r = @benchmark $f($args...) samples = samples evals = evals
+    times = r.times / 1e9
+    # compile latency: the first call less a steady state call
+    compile_time = first_call === nothing ? nothing : max(first_call - minimum(times), 0.0)
+    return Dict(
+        "I" => n,
+        "Language" => language,
+        "MinTime" => minimum(times),
+        "MeanTime" => mean(times),
+        "MedianTime" => median(times),
+        "ProcessPeakMemory" => Sys.maxrss() / 2^20,
+        "AllocatedMemory" => r.memory / 2^20,
+        "Times" => times,
+        "CompileTime" => compile_time,
+    )
+end
+
+function serve(run_cell)
+    println("@ready")
+    flush(stdout)
+    for line in eachline(stdin)
+        command = JSON.parse(line)
+        result = try
+            run_cell(command)
+        catch e
+            Dict("error" => sprint(showerror, e))
+        end
+        println("@result ", JSON.json(result))
+        flush(stdout)
+    end
+end
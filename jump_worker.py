@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import atexit
+import subprocess
+import pandas as pd
+
+# first call of a JuMP builder in its worker less a steady state call, and the
+# start of the worker (package loading) on its first cell, in seconds; the
+# peak RSS of the whole julia process so far (not of the cell) in MiB
+JULIA_COLUMNS = ("CompileTime", "StartupTime", "ProcessPeakMemory")
+PACKAGES = ("JuMP", "JSON", "DataFrames", "BenchmarkTools", "Gurobi")
+
+
+########## Worker ##########
+class JuliaWorker:
+    # long-lived julia process running the worker mode of a model script
+    # (jump_worker.jl): cells are sent as JSON lines and answered with
+    # "@result <json>" lines, so packages are loaded and builders compiled once
+
+    def __init__(self, script, sysimage=None):
+        command = ["julia", "--startup-file=no"]
+        if sysimage is not None:
+            command.append(f"--sysimage={sysimage}")
+        start = time.perf_counter()
+        self.process = subprocess.Popen(
+            command + [script, "worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self.pid = os.getpid()
+        self.receive("@ready")
+        self.startup = time.perf_counter() - start
+        # no cell reported the startup yet
+        self.new = True
+
+    def receive(self, prefix):
+        for line in self.process.stdout:
+            if line.startswith(prefix):
+                return line[len(prefix) :].strip()
+            # log of the worker, e.g. solver banners
+            print(line, end="")
+        raise RuntimeError(f"julia worker exited with {self.process.wait()}")
+
+    def run(self, **command):
+        self.process.stdin.write(json.dumps(command) + "\n")
+        self.process.stdin.flush()
+        result = json.loads(self.receive("@result"))
+        if "error" in result:
+            raise RuntimeError(f"julia worker: {result['error']}")
+        return result
+
+    def close(self):
+        # the worker stops at the end of its input
+        self.process.stdin.close()
+        self.process.wait()
+
+
+# workers of this process, by (script, sysimage)
+workers = {}
+
+
+def get_worker(script, sysimage=None):
+    key = (script, sysimage)
+    worker = workers.get(key)
+    if worker is None or worker.pid != os.getpid():
+        # a forked process starts its own worker, it must not share the pipes
+        worker = workers[key] = JuliaWorker(script, sysimage)
+    return worker
+
+
+@atexit.register
+def close_workers():
+    for worker in workers.values():
+        if worker.pid == os.getpid():
+            worker.close()
+    workers.clear()
+
+
+########## Cells ##########
+def run_jump_cell(
+    script, language, n, solve, repeats, number, data_format="bin", sysimage=None
+):
+    # one JuMP cell in the persistent worker of script, the data of n has to
+    # be exported already
+    worker = get_worker(script, sysimage)
+    result = worker.run(
+        language=language,
+        n=n,
+        solve=str(solve),
+        samples=repeats,
+        evals=number,
+        format=data_format,
+    )
+    result["StartupTime"] = worker.startup if worker.new else None
+    worker.new = False
+    return pd.DataFrame({column: [value] for column, value in result.items()})
+
+
+def build_sysimage(path):
+    # PackageCompiler sysimage with the packages of the JuMP scripts, pass it
+    # as sysimage to skip package loading in the workers
+    subprocess.run(
+        [
+            "julia",
+            "-e",
+            "using PackageCompiler; create_sysimage("
+            f"{json.dumps(list(PACKAGES))}; sysimage_path={json.dumps(path)})",
+        ],
+        check=True,
+    )
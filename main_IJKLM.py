@@ -1,132 +1,258 @@
+import sys
+from functools import partial
 import pandas as pd
-import numpy as np
 
 # import submodules
 import IJKLM.data_generation as data
-import visualization
 from help import (
     create_directories,
-    create_data_frame,
     incremental_range,
     save_to_json,
-    below_time_limit,
-    process_results,
-    print_log_message,
-    save_results,
+    save_to_columns,
 )
-from IJKLM.run_gurobipy import run_gurobi, run_fast_gurobi
-from IJKLM.run_gams import data_to_gams, run_gams
-from IJKLM.run_pyomo import run_pyomo, run_fast_pyomo
-from IJKLM.run_jump import run_julia
+from sweep import Instance, run_sweep
+from store import ResultStore, save_views
+from startup import run_startup
+from cache import cached_sets
+from shared import share_sets, attach_sets, release
+from IJKLM.join import build_join_index, join, x_groups
+from IJKLM.run_gurobipy import (
+    run_gurobi,
+    run_fast_gurobi,
+    run_joined_gurobi,
+    run_matrix_gurobi,
+)
+from IJKLM.run_gams import data_to_gams, run_gams, run_persistent_gams
+from IJKLM.run_pyomo import (
+    run_pyomo,
+    run_fast_pyomo,
+    run_joined_pyomo,
+    run_kernel_pyomo,
+    run_linear_pyomo,
+    run_persistent_pyomo,
+    run_reused_pyomo,
+)
+from IJKLM.run_jump import run_julia, run_fast_jump, run_jump
+
+
+############## Backends ##########################
+# language: (run function, instance inputs)
+BACKENDS = {
+    "GurobiPy": (run_gurobi, ("I", "IJK", "JKL", "KLM")),
+    "Fast GurobiPy": (run_fast_gurobi, ("I", "IJK", "JKL", "KLM")),
+    "Joined GurobiPy": (run_joined_gurobi, ("I", "X", "X_I")),
+    "Matrix GurobiPy": (run_matrix_gurobi, ("I", "X_set", "X_indptr")),
+    # restricts the GDX of the sweep to the first n products
+    "GAMS": (run_gams, ("I",)),
+    # compiled once per process, every n restarts from its checkpoint
+    "GAMS (persistent)": (run_persistent_gams, ("I",)),
+    "Pyomo": (run_pyomo, ("I", "IJK", "JKL", "KLM")),
+    "Fast Pyomo": (run_fast_pyomo, ("I", "IJK", "JKL_dict", "KLM_dict")),
+    "Joined Pyomo": (run_joined_pyomo, ("I", "X", "X_I")),
+    "Kernel Pyomo": (run_kernel_pyomo, ("I", "X", "X_I")),
+    "Linear Pyomo": (run_linear_pyomo, ("I", "X", "X_I")),
+    "Persistent Pyomo": (run_persistent_pyomo, ("I", "X", "X_I")),
+    "Reused Persistent Pyomo": (run_reused_pyomo, ("I", "X", "X_I")),
+}
+# in-memory solver handoff, without solving they are the same as Joined Pyomo
+SOLVE_ONLY = ("Persistent Pyomo", "Reused Persistent Pyomo")
+# compiled once per process, a process per cell (memory, isolate) would
+# compile them for every cell
+PER_PROCESS = ("GAMS (persistent)",)
+
+# how the inputs are derived from the generated index sets
+RULES = {
+    "I": lambda d: d["ijk_set"].labels["i"].tolist(),
+    "IJK": lambda d: d["ijk_set"].to_tuples(),
+    "JKL": lambda d: d["jkl_set"].to_tuples(),
+    "KLM": lambda d: d["klm_set"].to_tuples(),
+    "fixed_dicts": lambda d: data.fixed_data_to_dicts(d["JKL"], d["KLM"]),
+    "JKL_dict": lambda d: d["fixed_dicts"][0],
+    "KLM_dict": lambda d: d["fixed_dicts"][1],
+    # expand IJK ⋈ JKL ⋈ KLM once for all joined builders
+    "join": lambda d: join(d["ijk_set"], d["join_index"]),
+    "X": lambda d: d["join"][0].to_tuples(),
+    "X_I": lambda d: x_groups(*d["join"]),
+    "X_set": lambda d: d["join"][0],
+    "X_indptr": lambda d: d["join"][1],
+}
+
+
+############## Data ##########################
+SOURCES = ("IJKLM/data_generation.py", "index_set.py")
+FIXED = ("labels", "jkl_set", "klm_set", "join_index")
+FIXED += ("JKL", "KLM", "JKL_dict", "KLM_dict")
+
+
+def create_sets(n, cardinality_of_j, seed):
+    labels, JKL, KLM = data.create_sparse_fixed_data(m=cardinality_of_j, seed=seed)
+    IJK = data.create_sparse_variable_data(n=n, labels=labels, seed=seed)
+    return {"JKL": JKL, "KLM": KLM, "IJK": IJK}
+
+
+def load_data(N, cardinality_of_j, seed, cache=True):
+    # create the data for the largest n (or load it from the cache), every
+    # smaller instance is a prefix of it
+    params = {"n": max(N), "cardinality_of_j": cardinality_of_j, "seed": seed}
+    if cache:
+        return cached_sets("IJKLM", params, SOURCES, partial(create_sets, **params))
+    return create_sets(**params)
+
+
+def share_data(N, cardinality_of_j, seed, cache=True):
+    # place the data in shared memory once for the worker processes
+    blocks = []
+    shared = share_sets(load_data(N, cardinality_of_j, seed, cache), blocks)
+    return shared, blocks
+
+
+def create_instances(N, cardinality_of_j, seed, cache=True, shared=None):
+    if shared is not None:
+        # views of the arrays the driver placed in shared memory
+        sets = attach_sets(shared)
+    else:
+        sets = load_data(N, cardinality_of_j, seed, cache)
+    JKL, KLM = sets["JKL"], sets["KLM"]
+
+    # convert fixed data once for the whole sweep
+    fixed = Instance(
+        RULES,
+        labels=dict(JKL.labels, **KLM.labels),
+        jkl_set=JKL,
+        klm_set=KLM,
+        # index JKL on (j, k) and KLM on (k, l)
+        join_index=build_join_index(JKL, KLM),
+    )
+    fixed = {x: fixed[x] for x in FIXED}
+
+    # variable data for every n in |I|
+    for n, IJK in data.prefix_variable_data(N=N, ijk=sets["IJK"]):
+        yield n, Instance(RULES, ijk_set=IJK, **fixed)
+
+
+def export_data(n, instance, data_format):
+    # save data for JuMP as int32 columns or as json
+    if data_format == "bin":
+        save_to_columns(instance["ijk_set"], "IJK", f"_{n}", "IJKLM")
+    else:
+        save_to_json(instance["IJK"], "IJK", f"_{n}", "IJKLM")
 
 
 ############## Experiment ##########################
 def run_experiment(
-    cardinality_of_i, cardinality_of_j, solve, repeats, number, time_limit
+    cardinality_of_i,
+    cardinality_of_j,
+    solve,
+    repeats,
+    number,
+    time_limit,
+    parallel=False,
+    max_workers=None,
+    cpus=None,
+    cache=True,
+    data_format="bin",
+    memory=False,
+    trace=0,
+    isolate=False,
+    gc=False,
+    share=True,
+    sampling=None,
+    margin=1.5,
+    resume=False,
+    jump="worker",
+    sysimage=None,
 ):
-    np.random.seed(13)
-
-    # create empty frames for results
-    df_fast_jump = create_data_frame()
-    df_jump = create_data_frame()
-    df_pyomo = create_data_frame()
-    df_fast_pyomo = create_data_frame()
-    df_gurobi = create_data_frame()
-    df_fast_gurobi = create_data_frame()
-    df_gams = create_data_frame()
+    # jump: "worker" runs the JuMP cells in a persistent julia process during
+    # the sweep (with the PackageCompiler sysimage if given), "batch" runs the
+    # JuMP script once after it
+    seed = 13
+    # every cell is recorded here as it completes, with the environment
+    store = ResultStore(
+        "IJKLM",
+        solve,
+        {"cardinality_of_j": cardinality_of_j, "seed": seed},
+        resume=resume,
+    )
 
     # define the x axis
     N = list(incremental_range(100, cardinality_of_i + 1, 200, 100))
 
-    # create fixed data and convert to tuples and dicts
-    J, K, L, M, JKL, KLM = data.create_fixed_data(m=cardinality_of_j)
-    jkl_tuple, klm_tuple = data.fixed_data_to_tuples(JKL, KLM)
-    jkl_dict, klm_dict = data.fixed_data_to_dicts(jkl_tuple, klm_tuple)
-
-    # save data to json for JuMP
+    # save fixed data for JuMP
+    labels, JKL, KLM = data.create_sparse_fixed_data(m=cardinality_of_j, seed=seed)
     save_to_json(N, "N", "", "IJKLM")
-    save_to_json(jkl_tuple, "JKL", "", "IJKLM")
-    save_to_json(klm_tuple, "KLM", "", "IJKLM")
+    if data_format == "bin":
+        save_to_columns(JKL, "JKL", "", "IJKLM")
+        save_to_columns(KLM, "KLM", "", "IJKLM")
+    else:
+        save_to_json(JKL.to_tuples(), "JKL", "", "IJKLM")
+        save_to_json(KLM.to_tuples(), "KLM", "", "IJKLM")
+
+    # save the data of the largest n for GAMS once, its cells restrict it
+    sets = load_data(N, cardinality_of_j, seed, cache)
+    data_to_gams(IJK=sets["IJK"], JKL=sets["JKL"], KLM=sets["KLM"])
+
+    instances = partial(
+        create_instances, cardinality_of_j=cardinality_of_j, seed=seed, cache=cache
+    )
+
+    # hand the data to worker processes through shared memory
+    blocks = []
+    if share and (parallel or isolate):
+        shared, blocks = share_data(N, cardinality_of_j, seed, cache)
+        instances = partial(instances, shared=shared)
+
+    backends = {
+        language: backend
+        for language, backend in BACKENDS.items()
+        if (solve or language not in SOLVE_ONLY)
+        and not ((memory or isolate) and language in PER_PROCESS)
+    }
+    external = ()
+    if jump == "worker":
+        # JuMP cells interleaved with the python ones, inputs exported per n
+        for language, run in (("Fast JuMP", run_fast_jump), ("JuMP", run_jump)):
+            run = partial(run, data_format=data_format, sysimage=sysimage)
+            backends[language] = (run, ("I",))
+        external = ("Fast JuMP", "JuMP")
 
     # run experiment for every n in |I|
-    for n in N:
-        # create variable data and convert to tuples
-        I, IJK = data.create_variable_data(n=n, j=J, k=K)
-        ijk_tuple = data.variable_data_to_tuples(IJK)
-
-        # save data to json for JuMP
-        save_to_json(ijk_tuple, "IJK", f"_{n}", "IJKLM")
-        
-        # Gurobi
-        if below_time_limit(df_gurobi, time_limit):
-            rr = run_gurobi(I, ijk_tuple, jkl_tuple, klm_tuple, solve,
-                                    repeats=repeats, number=number)
-            df_gurobi = process_results(rr, df_gurobi)
-            print_log_message(language='GurobiPy', n=n, df=df_gurobi)
-
-        # Fast Gurobi
-        if below_time_limit(df_fast_gurobi, time_limit):
-            rr = run_fast_gurobi(
-                I, ijk_tuple, jkl_tuple, klm_tuple, solve, repeats=repeats, number=number)
-            df_fast_gurobi = process_results(rr, df_fast_gurobi)
-            print_log_message(language='Fast GurobiPy', n=n, df=df_fast_gurobi)
-
-        # GAMS
-        if below_time_limit(df_gams, time_limit):
-            data_to_gams(I, J, K, L, M, IJK, JKL, KLM)
-            rr = run_gams(solve, n, repeats=repeats, number=number)
-            df_gams = process_results(rr, df_gams)
-            print_log_message(language='GAMS', n=n, df=df_gams)
-
-        # Pyomo
-        if below_time_limit(df_pyomo, time_limit):
-            rr = run_pyomo(
-                I=I,
-                IJK=ijk_tuple,
-                JKL=jkl_tuple,
-                KLM=klm_tuple,
-                solve=solve,
-                repeats=repeats,
-                number=number,
-            )
-            df_pyomo = process_results(rr, df_pyomo)
-            print_log_message(language="Pyomo", n=n, df=df_pyomo)
-
-        # Fast Pyomo
-        if below_time_limit(df_fast_pyomo, time_limit):
-            rr = run_fast_pyomo(
-                I=I,
-                IJK=ijk_tuple,
-                JKL=jkl_dict,
-                KLM=klm_dict,
-                solve=solve,
-                repeats=repeats,
-                number=number,
-            )
-            df_fast_pyomo = process_results(rr, df_fast_pyomo)
-            print_log_message(language="Fast Pyomo", n=n, df=df_fast_pyomo)
-
-    # JuMP
-    df_fast_jump, df_jump = run_julia(solve, repeats, number, time_limit)
-
-    # merge all results
-    df = pd.concat(
-        [
-            df_fast_jump,
-            df_jump,
-            df_pyomo,
-            df_fast_pyomo,
-            df_gurobi,
-            df_fast_gurobi,
-            df_gams
-        ]
-    ).reset_index(drop=True)
-
-    # save results
-    save_results(df, solve, "IJKLM")
-
-    # plot results
-    visualization.plot_results(df, cardinality_of_j, solve, "IJKLM")
+    try:
+        run_sweep(
+            N=N,
+            backends=backends,
+            instances=instances,
+            time_limit=time_limit,
+            solve=solve,
+            repeats=repeats,
+            number=number,
+            export=partial(export_data, data_format=data_format),
+            parallel=parallel,
+            max_workers=max_workers,
+            cpus=cpus,
+            memory=memory,
+            trace=trace,
+            isolate=isolate,
+            gc=gc,
+            sampling=sampling,
+            margin=margin,
+            store=store,
+            resume=resume,
+            external=external,
+        )
+    finally:
+        release(blocks)
+
+    # JuMP in one batch, unless a resumed run has its results already
+    if jump == "batch" and not (
+        resume and {"JuMP", "Fast JuMP"} <= store.languages()
+    ):
+        df_fast_jump, df_jump = run_julia(
+            solve, repeats, number, time_limit, data_format
+        )
+        store.record(pd.concat([df_fast_jump, df_jump]))
+
+    # save results and plot them from the store
+    save_views(store)
 
 
 if __name__ == "__main__":
@@ -134,6 +260,13 @@ if __name__ == "__main__":
     CJ = 20
 
     create_directories("IJKLM")
+
+    # python main_IJKLM.py startup [sysimage]: cold and warm startup of the
+    # stacks, julia with the PackageCompiler sysimage if given
+    if sys.argv[1:2] == ["startup"]:
+        run_startup("IJKLM", sysimage=(sys.argv[2:] or [None])[0])
+        sys.exit()
+
     solve = True
     # for solve in [False, True]:
     run_experiment(
@@ -143,4 +276,5 @@ if __name__ == "__main__":
         repeats=3,
         number=1,
         time_limit=60,
+        sampling={"target": 0.05, "budget": 60},
     )
@@ -1,207 +1,244 @@
+import sys
+from functools import partial
 import pandas as pd
-import numpy as np
 
 # import submodules
 import supply_chain.data_generation as data
-import visualization
 from help import (
     create_directories,
-    create_data_frame,
     incremental_range,
     save_to_json,
     save_to_json_d,
-    below_time_limit,
-    process_results,
-    print_log_message,
-    save_results,
+    save_to_columns,
 )
-from supply_chain.run_gurobipy import run_gurobi, run_fast_gurobi
-from supply_chain.run_gams import run_gams
-from supply_chain.run_pyomo import run_pyomo, run_fast_pyomo
-from supply_chain.run_jump import run_julia
+from sweep import Instance, run_sweep
+from store import ResultStore, save_views
+from startup import run_startup
+from cache import cached_sets
+from shared import share_sets, attach_sets, release
+from supply_chain.run_gurobipy import run_gurobi, run_fast_gurobi, run_matrix_gurobi
+from supply_chain.run_gams import data_to_gams, run_gams, run_persistent_gams
+from supply_chain.run_pyomo import (
+    run_pyomo,
+    run_fast_pyomo,
+    run_kernel_pyomo,
+    run_linear_pyomo,
+    run_persistent_pyomo,
+    run_reused_pyomo,
+)
+from supply_chain.run_jump import run_julia, run_fast_jump, run_jump
+
+
+############## Backends ##########################
+SETS = ("IK", "IL", "IM", "IJK", "IKL", "ILM")
+GROUPS = ("IK_IJK", "IK_IKL", "IL_IKL", "IL_ILM", "IM_ILM")
+
+# language: (run function, instance inputs)
+BACKENDS = {
+    "GurobiPy": (run_gurobi, ("I", *SETS, "D")),
+    "Fast GurobiPy": (run_fast_gurobi, ("I", *SETS, *GROUPS, "D")),
+    "Matrix GurobiPy": (
+        run_matrix_gurobi,
+        ("I", *(f"{x}_set" for x in SETS), "D_set"),
+    ),
+    # restricts the GDX of the sweep to the first n products
+    "GAMS": (run_gams, ("I",)),
+    # compiled once per process, every n restarts from its checkpoint
+    "GAMS (persistent)": (run_persistent_gams, ("I",)),
+    "Pyomo": (run_pyomo, ("I", *SETS, "D")),
+    "Fast Pyomo": (run_fast_pyomo, ("I", *SETS, *GROUPS, "D")),
+    "Kernel Pyomo": (run_kernel_pyomo, ("I", *SETS, *GROUPS, "D")),
+    "Linear Pyomo": (run_linear_pyomo, ("I", *SETS, *GROUPS, "D")),
+    "Persistent Pyomo": (run_persistent_pyomo, ("I", *SETS, *GROUPS, "D")),
+    "Reused Persistent Pyomo": (run_reused_pyomo, ("I", *SETS, *GROUPS, "D")),
+}
+# in-memory solver handoff, without solving they are the same as Fast Pyomo
+SOLVE_ONLY = ("Persistent Pyomo", "Reused Persistent Pyomo")
+# compiled once per process, a process per cell (memory, isolate) would
+# compile them for every cell
+PER_PROCESS = ("GAMS (persistent)",)
+
+# how the inputs are derived from the generated index sets
+RULES = {
+    "I": lambda d: d["labels"]["i"].tolist(),
+    **{x: (lambda d, x=x: d[f"{x}_set"].to_tuples()) for x in SETS},
+    "D": lambda d: d["D_set"].to_dict(),
+    # group the sets on their integer codes
+    "groups": lambda d: [
+        view.prepare() for view in data.data_to_views(*(d[f"{x}_set"] for x in SETS))
+    ],
+    **{x: (lambda d, n=n: d["groups"][n]) for n, x in enumerate(GROUPS)},
+}
+
+
+############## Data ##########################
+SOURCES = ("supply_chain/data_generation.py", "index_set.py")
+
+
+def create_sets(n, cardinality_of_j, seed):
+    J, K, L, M = data.create_fixed_data(m=cardinality_of_j)
+    sets = data.create_variable_data(n=n, J=J, K=K, L=L, M=M, seed=seed)[1:]
+    return dict(zip((*SETS, "D"), sets))
+
+
+def load_data(n, cardinality_of_j, seed, cache=True):
+    # create the variable data of n (or load it from the cache)
+    params = {"n": n, "cardinality_of_j": cardinality_of_j, "seed": seed}
+    if cache:
+        return cached_sets(
+            "supply_chain", params, SOURCES, partial(create_sets, **params)
+        )
+    return create_sets(**params)
+
+
+def share_data(N, cardinality_of_j, seed, cache=True):
+    # place the data of every n in shared memory once for the worker processes
+    blocks = []
+    shared = {
+        n: share_sets(load_data(n, cardinality_of_j, seed, cache), blocks) for n in N
+    }
+    return shared, blocks
+
+
+def create_instances(N, cardinality_of_j, seed, cache=True, shared=None):
+    # variable data for every n in |I|, views of the arrays the driver placed in
+    # shared memory if there are any
+    for n in N:
+        if shared is not None:
+            sets = attach_sets(shared[n])
+        else:
+            sets = load_data(n, cardinality_of_j, seed, cache)
+
+        yield n, Instance(
+            RULES,
+            labels={d: x for s in sets.values() for d, x in s.labels.items()},
+            **{f"{x}_set": sets[x] for x in SETS},
+            D_set=sets["D"],
+        )
+
+
+def export_data(n, instance, data_format):
+    # save data for JuMP as int32 columns or as json
+    if data_format == "bin":
+        for x in (*SETS, "D"):
+            save_to_columns(instance[f"{x}_set"], x, f"_{n}", "supply_chain")
+    else:
+        for x in SETS:
+            save_to_json(instance[x], x, f"_{n}", "supply_chain")
+        save_to_json_d(instance["D"], "D", f"_{n}", "supply_chain")
 
 
 ############## Experiment ##########################
 def run_experiment(
-    cardinality_of_i, cardinality_of_j, solve, repeats, number, time_limit
+    cardinality_of_i,
+    cardinality_of_j,
+    solve,
+    repeats,
+    number,
+    time_limit,
+    parallel=False,
+    max_workers=None,
+    cpus=None,
+    cache=True,
+    data_format="bin",
+    memory=False,
+    trace=0,
+    isolate=False,
+    gc=False,
+    share=True,
+    sampling=None,
+    margin=1.5,
+    resume=False,
+    jump="worker",
+    sysimage=None,
 ):
-    np.random.seed(13)
-
-    # create empty frames for results
-    df_jump = create_data_frame()
-    df_fast_jump = create_data_frame()
-    df_pyomo = create_data_frame()
-    df_fast_pyomo = create_data_frame()
-    df_gurobi = create_data_frame()
-    df_fast_gurobi = create_data_frame()
-    df_gams = create_data_frame()
+    # jump: "worker" runs the JuMP cells in a persistent julia process during
+    # the sweep (with the PackageCompiler sysimage if given), "batch" runs the
+    # JuMP script once after it
+    seed = 13
+    # every cell is recorded here as it completes, with the environment
+    store = ResultStore(
+        "supply_chain",
+        solve,
+        {"cardinality_of_j": cardinality_of_j, "seed": seed},
+        resume=resume,
+    )
 
     # define the x axis
     N = list(incremental_range(50, cardinality_of_i + 1, 50, 50))
 
-    # create fixed data and convert to tuples and dicts
+    # save fixed data for JuMP
     J, K, L, M = data.create_fixed_data(m=cardinality_of_j)
-
-    # save data to json for JuMP
     save_to_json(N, "N", "", "supply_chain")
     save_to_json(L, "L", "", "supply_chain")
     save_to_json(M, "M", "", "supply_chain")
 
+    # save the data of the largest n for GAMS once, its cells restrict it (the
+    # instances are prefixes of it, their products are drawn in blocks of 50)
+    data_to_gams(**load_data(max(N), cardinality_of_j, seed, cache))
+
+    instances = partial(
+        create_instances, cardinality_of_j=cardinality_of_j, seed=seed, cache=cache
+    )
+
+    # hand the data to worker processes through shared memory
+    blocks = []
+    if share and (parallel or isolate):
+        shared, blocks = share_data(N, cardinality_of_j, seed, cache)
+        instances = partial(instances, shared=shared)
+
+    backends = {
+        language: backend
+        for language, backend in BACKENDS.items()
+        if (solve or language not in SOLVE_ONLY)
+        and not ((memory or isolate) and language in PER_PROCESS)
+    }
+    external = ()
+    if jump == "worker":
+        # JuMP cells interleaved with the python ones, inputs exported per n
+        for language, run in (("Fast JuMP", run_fast_jump), ("JuMP", run_jump)):
+            run = partial(run, data_format=data_format, sysimage=sysimage)
+            backends[language] = (run, ("I",))
+        external = ("Fast JuMP", "JuMP")
+
     # run experiment for every n in |I|
-    for n in N:
-        # create variable data and convert to tuples
-        (
-            I,
-            ik_tuple,
-            il_tuple,
-            im_tuple,
-            ijk_tuple,
-            ikl_tuple,
-            ilm_tuple,
-            d_dict,
-        ) = data.create_variable_data(n=n, J=J, K=K, L=L, M=M)
-        # make dictionaries
-        IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM = data.data_to_dicts(
-            ik_tuple, il_tuple, im_tuple, ijk_tuple, ikl_tuple, ilm_tuple
+    try:
+        run_sweep(
+            N=N,
+            backends=backends,
+            instances=instances,
+            time_limit=time_limit,
+            solve=solve,
+            repeats=repeats,
+            number=number,
+            export=partial(export_data, data_format=data_format),
+            parallel=parallel,
+            max_workers=max_workers,
+            cpus=cpus,
+            memory=memory,
+            trace=trace,
+            isolate=isolate,
+            gc=gc,
+            sampling=sampling,
+            margin=margin,
+            store=store,
+            resume=resume,
+            external=external,
+        )
+    finally:
+        release(blocks)
+
+    # JuMP in one batch, unless a resumed run has its results already
+    if jump == "batch" and not (
+        resume and {"JuMP", "Fast JuMP"} <= store.languages()
+    ):
+        df_fast_jump, df_jump = run_julia(
+            solve, repeats, number, time_limit, data_format
         )
+        store.record(pd.concat([df_jump, df_fast_jump]))
 
-        # save data to json for JuMP
-        save_to_json(ik_tuple, "IK", f"_{n}", "supply_chain")
-        save_to_json(il_tuple, "IL", f"_{n}", "supply_chain")
-        save_to_json(im_tuple, "IM", f"_{n}", "supply_chain")
-        save_to_json(ijk_tuple, "IJK", f"_{n}", "supply_chain")
-        save_to_json(ikl_tuple, "IKL", f"_{n}", "supply_chain")
-        save_to_json(ilm_tuple, "ILM", f"_{n}", "supply_chain")
-        save_to_json_d(d_dict, "D", f"_{n}", "supply_chain")
-
-        # GurobiPy
-        if below_time_limit(df_gurobi, time_limit):
-            rr = run_gurobi(
-                I=I,
-                ik=ik_tuple,
-                il=il_tuple,
-                im=im_tuple,
-                ijk=ijk_tuple,
-                ikl=ikl_tuple,
-                ilm=ilm_tuple,
-                D=d_dict,
-                solve=solve,
-                repeats=repeats,
-                number=number,
-            )
-            df_gurobi = process_results(rr, df_gurobi)
-            print_log_message(
-                language="GurobiPy", n=n, df=df_gurobi
-            )
-
-        # Fast GurobiPy
-        if below_time_limit(df_fast_gurobi, time_limit):
-            rr = run_fast_gurobi(
-                I=I,
-                ik=ik_tuple,
-                il=il_tuple,
-                im=im_tuple,
-                ijk=ijk_tuple,
-                ikl=ikl_tuple,
-                ilm=ilm_tuple,
-                ik_ijk=IK_IJK,
-                ik_ikl=IK_IKL,
-                il_ikl=IL_IKL,
-                il_ilm=IL_ILM,
-                im_ilm=IM_ILM,
-                D=d_dict,
-                solve=solve,
-                repeats=repeats,
-                number=number,
-            )
-            df_fast_gurobi = process_results(rr, df_fast_gurobi)
-            print_log_message(language="Fast GurobiPy", n=n, df=df_fast_gurobi)
-
-        # GAMS
-        if below_time_limit(df_gams, time_limit):
-            rr = run_gams(
-                I=I,
-                J=J,
-                K=K,
-                L=L,
-                M=M,
-                IK=ik_tuple,
-                IL=il_tuple,
-                IM=im_tuple,
-                IJK=ijk_tuple,
-                IKL=ikl_tuple,
-                ILM=ilm_tuple,
-                D=d_dict,
-                solve=solve,
-                N=n,
-                repeats=repeats,
-                number=number,
-            )
-            df_gams = process_results(rr, df_gams)
-            print_log_message(language="GAMS", n=n, df=df_gams)
-
-        # Pyomo
-        if below_time_limit(df_pyomo, time_limit):
-            rr = run_pyomo(
-                I=I,
-                IK=ik_tuple,
-                IL=il_tuple,
-                IM=im_tuple,
-                IJK=ijk_tuple,
-                IKL=ikl_tuple,
-                ILM=ilm_tuple,
-                D=d_dict,
-                solve=solve,
-                repeats=repeats,
-                number=number,
-            )
-            df_pyomo = process_results(rr, df_pyomo)
-            print_log_message(language="Pyomo", n=n, df=df_pyomo)
-
-        # Fast Pyomo
-        if below_time_limit(df_fast_pyomo, time_limit):
-            rr = run_fast_pyomo(
-                I=I,
-                IK=ik_tuple,
-                IL=il_tuple,
-                IM=im_tuple,
-                IJK=ijk_tuple,
-                IKL=ikl_tuple,
-                ILM=ilm_tuple,
-                IK_IJK=IK_IJK,
-                IK_IKL=IK_IKL,
-                IL_IKL=IL_IKL,
-                IL_ILM=IL_ILM,
-                IM_ILM=IM_ILM,
-                D=d_dict,
-                solve=solve,
-                repeats=repeats,
-                number=number,
-            )
-            df_fast_pyomo = process_results(rr, df_fast_pyomo)
-            print_log_message(language="Fast Pyomo", n=n, df=df_fast_pyomo)
-
-    # JuMP
-    df_fast_jump, df_jump = run_julia(solve, repeats, number, time_limit)
-
-    # merge all results
-    df = pd.concat(
-        [
-            df_jump,
-            df_fast_jump,
-            df_pyomo,
-            df_fast_pyomo,
-            df_gurobi,
-            df_fast_gurobi,
-            df_gams
-        ]
-    ).reset_index(drop=True)
-
-    # save results
-    save_results(df, solve, "supply_chain")
-
-    # plot results
-    visualization.plot_results(df, cardinality_of_j, solve, "supply_chain")
+    # save results and plot them from the store
+    save_views(store)
 
 
 if __name__ == "__main__":
@@ -210,6 +247,12 @@ if __name__ == "__main__":
 
     create_directories("supply_chain")
 
+    # python main_suppy_chain.py startup [sysimage]: cold and warm startup of the
+    # stacks, julia with the PackageCompiler sysimage if given
+    if sys.argv[1:2] == ["startup"]:
+        run_startup("supply_chain", sysimage=(sys.argv[2:] or [None])[0])
+        sys.exit()
+
     for solve in [False, True]:
         run_experiment(
             cardinality_of_i=CI,
@@ -218,4 +261,5 @@ if __name__ == "__main__":
             repeats=4,
             number=1,
             time_limit=5,
+            sampling={"target": 0.05, "budget": 5},
         )
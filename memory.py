@@ -0,0 +1,140 @@
+import os
+import resource
+import tracemalloc
+import multiprocessing
+import numpy as np
+
+import timing
+
+########## Columns ##########
+# peak and starting RSS of a cell, the increase of the cell over its start
+# (the inputs derived before it are part of the start), peak traced Python
+# memory (tracemalloc) and memory allocated per evaluation (JuMP); all in MiB
+MEMORY_COLUMNS = ("PeakMemory", "BaseMemory", "CellMemory", "TracedMemory")
+MEMORY_COLUMNS += ("AllocatedMemory",)
+# largest allocations of a traced cell at the end of the builder phase with
+# the most traced memory (the model is still alive then), or after the cell
+# for backends without phases; as text
+TRACE_COLUMNS = ("TopAllocators",)
+MiB = 1024**2
+
+
+########## Probes ##########
+def read_status(field):
+    # value of a /proc/self/status field in bytes, None if it is not available
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak():
+    # let VmHWM restart from the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    # peak RSS of this process and of its largest finished child (GAMS)
+    own = read_status("VmHWM")
+    if own is None:
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    return own, children
+
+
+def format_allocators(snapshot, trace):
+    return "; ".join(
+        f"{s.traceback[0].filename}:{s.traceback[0].lineno} {s.size / MiB:.1f}MiB"
+        for s in snapshot.statistics("lineno")[:trace]
+    )
+
+
+class PeakSnapshot:
+    # snapshot of the traced allocations at the end of the phase with the most
+    # traced memory so far
+    def __init__(self):
+        self.size = -1
+        self.snapshot = None
+
+    def __call__(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self.size:
+            self.size = current
+            self.snapshot = tracemalloc.take_snapshot()
+
+
+def trace_allocations(traced, trace):
+    # one extra, untimed run under tracemalloc, so the timed runs are not
+    # slowed down; returns the peak traced memory and the top allocators
+    snapshot = PeakSnapshot()
+    sampling, timing.sampling = timing.sampling, None
+    timing.phase_end = snapshot
+    tracemalloc.start()
+    try:
+        traced()
+        peak = tracemalloc.get_traced_memory()[1]
+        if snapshot.snapshot is None:
+            snapshot()
+        return peak / MiB, format_allocators(snapshot.snapshot, trace)
+    finally:
+        tracemalloc.stop()
+        timing.phase_end = None
+        timing.sampling = sampling
+
+
+########## Cells ##########
+def measure(run, trace=0, traced=None):
+    # run the cell in this process and add the memory columns to its results;
+    # traced: a single execution of the cell for the trace, run by default
+    base = read_status("VmRSS")
+    reset_peak()
+    rr = run()
+    own, children = peak_rss()
+
+    rr["PeakMemory"] = max(own, children) / MiB
+    rr["BaseMemory"] = np.nan if base is None else base / MiB
+    # a child process of the cell is all its own
+    rr["CellMemory"] = np.nan if base is None else max(own - base, children) / MiB
+    if trace:
+        rr["TracedMemory"], rr["TopAllocators"] = trace_allocations(
+            run if traced is None else traced, trace
+        )
+    return rr
+
+
+def measured(run, trace, traced, connection):
+    # child of run_measured
+    try:
+        connection.send((True, measure(run, trace, traced)))
+    except BaseException as e:
+        connection.send((False, e))
+    finally:
+        connection.close()
+
+
+def run_measured(run, trace=0, traced=None):
+    # run() in a forked child, so every cell starts from the same baseline and
+    # the peak of the cell can not be hidden by earlier cells
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=measured, args=(run, trace, traced, sender))
+    process.start()
+    sender.close()
+    try:
+        ok, result = receiver.recv()
+    except EOFError:
+        ok, result = False, RuntimeError("memory measurement process died")
+    process.join()
+
+    if not ok:
+        raise result
+    return result
@@ -0,0 +1,63 @@
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+from index_set import IndexSet, Labels
+
+
+########## Arrays ##########
+# blocks attached by this process, they have to stay open while views exist
+attached = {}
+
+
+def share_array(array, blocks):
+    # copy array into a new shared memory block once
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    blocks.append(shm)
+    return shm.name, array.shape, array.dtype.str
+
+
+def attach_array(spec):
+    # numpy view of a shared block, nothing is copied
+    name, shape, dtype = spec
+    if name not in attached:
+        attached[name] = SharedMemory(name=name)
+    return np.ndarray(shape, dtype, buffer=attached[name].buf)
+
+
+########## Index Sets ##########
+def share_sets(sets, blocks):
+    # descriptor of the sets, small enough to be pickled to every worker
+    return {
+        name: {
+            "dims": s.dims,
+            "labels": {d: [s.labels[d].prefix, len(s.labels[d])] for d in s.dims},
+            "codes": share_array(s.codes, blocks),
+            "values": None if s.values is None else share_array(s.values, blocks),
+        }
+        for name, s in sets.items()
+    }
+
+
+def attach_sets(descriptor):
+    # the sets of a descriptor share their label tables
+    labels = {}
+    sets = {}
+    for name, m in descriptor.items():
+        for d, (prefix, size) in m["labels"].items():
+            if d not in labels or len(labels[d]) != size:
+                labels[d] = Labels(prefix, size)
+        sets[name] = IndexSet(
+            m["dims"],
+            attach_array(m["codes"]),
+            {d: labels[d] for d in m["dims"]},
+            None if m["values"] is None else attach_array(m["values"]),
+        )
+    return sets
+
+
+def release(blocks):
+    # called by the process that shared the blocks once all workers are done
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,214 @@
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import matplotlib.pyplot as plt
+
+from store import ResultStore
+
+########## Stacks ##########
+# python stacks: (module that has to be installed, imports, tiny model)
+PYTHON = {
+    "Pyomo": (
+        "pyomo",
+        "import pyomo.environ as pyo",
+        "m = pyo.ConcreteModel()\n"
+        "m.x = pyo.Var(domain=pyo.NonNegativeReals)\n"
+        "m.c = pyo.Constraint(expr=m.x >= 0)",
+    ),
+    "GurobiPy": (
+        "gurobipy",
+        "import gurobipy as gp",
+        "m = gp.Model()\nx = m.addVar()\nm.addConstr(x >= 0)\nm.update()",
+    ),
+    "GAMS Transfer": (
+        "gams",
+        "import gams.transfer as gt",
+        'c = gt.Container()\nc.addSet("i", records=["i1"])',
+    ),
+}
+
+JULIA = """
+t = time()
+using JuMP, Gurobi
+loaded = time()
+m = Model()
+@variable(m, x >= 0)
+@constraint(m, x >= 0)
+println("@startup ", loaded - t, " ", time() - loaded)
+"""
+
+# the first model of GAMS is generated by its solve
+GAMS = """
+Set i / i1 /;
+Positive Variable x(i);
+Variable z;
+Equation o, e(i);
+o.. z =e= 1;
+e(i).. x(i) =g= 0;
+Model m / all /;
+m.solvelink = 5;
+solve m using lp minimizing z;
+"""
+
+PREFIX = "import time as _time\n_t = _time.perf_counter()\n"
+SUFFIX = "\nprint('@startup', _imported - _t, _time.perf_counter() - _imported)"
+
+
+########## Probes ##########
+def timed_run(command, cwd=None):
+    # wall time of a fresh process, the output of failing processes is raised
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{command[0]} failed: {result.stderr[-2000:]}")
+    return wall, result
+
+
+def parse_startup(stdout):
+    # (import or load time, first model time) printed by the snippets
+    match = re.search(r"@startup (\S+) (\S+)", stdout)
+    return float(match.group(1)), float(match.group(2))
+
+
+def import_breakdown(stderr, top=5):
+    # modules with the largest self time of a -X importtime log
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (.*)", line)
+        if match:
+            rows.append((int(match.group(1)), match.group(3).strip()))
+    rows.sort(reverse=True)
+    return "; ".join(f"{name} {us / 1e3:.0f}ms" for us, name in rows[:top])
+
+
+def python_startup(code, cold):
+    # cold: fresh bytecode cache, so every module is compiled again
+    with tempfile.TemporaryDirectory() as cache:
+        command = [sys.executable, "-X", "importtime"]
+        if cold:
+            command += ["-X", f"pycache_prefix={cache}"]
+        wall, result = timed_run(command + ["-c", code])
+    load, first_model = parse_startup(result.stdout)
+    return wall, load, first_model, import_breakdown(result.stderr)
+
+
+def julia_startup(cold, sysimage=None):
+    # the first start uses the compile cache of the depot like the others, it
+    # only differs by the page cache
+    command = ["julia", "--startup-file=no"]
+    if sysimage is not None:
+        command.append(f"--sysimage={sysimage}")
+    wall, result = timed_run(command + ["-e", JULIA])
+    load, first_model = parse_startup(result.stdout)
+    return wall, load, first_model, None
+
+
+def gams_startup(cold):
+    # time to the first generated (and solved) model, the cold start is the
+    # first one
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "startup.gms"), "w") as f:
+            f.write(GAMS)
+        wall, _ = timed_run(["gams", "startup.gms", "lo=0"], cwd=directory)
+    return wall, np.nan, np.nan, None
+
+
+def drop_caches():
+    # let the first run read the libraries from disk, needs root
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3")
+        return True
+    except OSError:
+        return False
+
+
+def probes(sysimage=None):
+    # stack: (probe(cold), whether its first start is a cold one), for the
+    # stacks installed here; python compiles every module again in its first
+    # start, julia and GAMS only find the page cache dropped (if permitted)
+    found = {}
+    for stack, (module, imports, model) in PYTHON.items():
+        if importlib.util.find_spec(module) is not None:
+            code = (
+                f"{PREFIX}{imports}\n_imported = _time.perf_counter()\n{model}{SUFFIX}"
+            )
+            found[stack] = (lambda cold, code=code: python_startup(code, cold), True)
+    if shutil.which("julia") is not None:
+        found["JuMP"] = (lambda cold: julia_startup(cold, sysimage), False)
+    if shutil.which("gams") is not None:
+        found["GAMS"] = (gams_startup, False)
+    return found
+
+
+########## Benchmark ##########
+def run_startup(model, repeats=5, sysimage=None):
+    # one cold (or first) and repeats warm starts of every stack in fresh
+    # processes, recorded in the store of model next to the scaling results;
+    # sysimage: PackageCompiler sysimage for julia
+    store = ResultStore(model, False, {"benchmark": "startup"})
+    frames = []
+    for stack, (probe, cold) in probes(sysimage).items():
+        dropped = drop_caches()
+        runs = [probe(True)] + [probe(False) for _ in range(repeats)]
+        first = "cold" if cold or dropped else "first"
+        for mode, samples in ((first, runs[:1]), ("warm", runs[1:])):
+            wall = [s[0] for s in samples]
+            best = samples[int(np.argmin(wall))]
+            rr = pd.DataFrame(
+                {
+                    "I": [0],
+                    "Language": [f"{stack} ({mode})"],
+                    "MinTime": [np.min(wall)],
+                    "MeanTime": [np.mean(wall)],
+                    "MedianTime": [np.median(wall)],
+                    "Times": [wall],
+                    "ImportTime": [best[1]],
+                    "FirstModelTime": [best[2]],
+                    "ImportBreakdown": [best[3]],
+                    "PageCacheDropped": [dropped if mode != "warm" else None],
+                }
+            )
+            store.record(rr)
+            frames.append(rr)
+            print(f"{stack + ' ' + mode:<19} started in {round(np.min(wall), 2)}s")
+
+    save_startup(store)
+    return pd.concat(frames).reset_index(drop=True)
+
+
+def save_startup(store):
+    # CSV and bar plot of the startup run of store
+    df = store.load(run=store.run)
+    columns = ["Language", "MinTime", "MedianTime", "ImportTime", "FirstModelTime"]
+    df[columns + ["ImportBreakdown"]].to_csv(
+        os.path.join(store.model, "results", "startup_results.csv"), index=False
+    )
+
+    sns.set_theme(
+        style="ticks",
+        rc={
+            "figure.dpi": 100,
+        },
+    )
+    plot = sns.catplot(
+        data=df,
+        x="MinTime",
+        y="Language",
+        hue="Language",
+        kind="bar",
+        palette="muted",
+        legend=False,
+    )
+    plot.set(xlabel="Startup Time [s]", ylabel="")
+    plt.savefig(f"plots/{store.model}/startup.png", dpi=300, bbox_inches="tight")
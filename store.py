@@ -0,0 +1,177 @@
+import os
+import json
+import sqlite3
+import datetime
+from contextlib import contextmanager
+import pandas as pd
+
+import visualization
+from environment import fingerprint
+from help import create_data_frame, save_results
+
+STORE = "results.sqlite"
+
+CELLS = """
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run TEXT,
+    created TEXT NOT NULL,
+    solve INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    language TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    samples TEXT,
+    result TEXT NOT NULL
+)
+"""
+
+
+########## Rows ##########
+def to_json(value):
+    # numpy scalars and arrays of the result rows
+    return json.dumps(value, default=lambda o: o.tolist(), sort_keys=True)
+
+
+########## Store ##########
+class ResultStore:
+    # append-only SQLite store of the cells of one model under <model>/results;
+    # every cell is recorded as soon as it completes, so a crash loses at most
+    # the running cells, and a resumed sweep skips the stored ones. The CSVs
+    # and plots are views of the store (save_views)
+
+    def __init__(self, model, solve, params=None, resume=False, read_only=False):
+        # params: what the cells depend on besides n, e.g. |J| and the seed
+        # (None only to read the cells of all params); the cells recorded by
+        # this store form a new run, or continue the latest one on resume.
+        # read_only: only read the runs, without a fingerprint or a run
+        self.model = model
+        self.solve = bool(solve)
+        self.params = params
+        self.path = os.path.join(model, "results", STORE)
+        with self.connect() as db:
+            db.execute(CELLS)
+            columns = [c[1] for c in db.execute("PRAGMA table_info(cells)")]
+            if "run" not in columns:
+                # stores written before runs were recorded
+                db.execute("ALTER TABLE cells ADD COLUMN run TEXT")
+
+        self.read_only = read_only
+        if read_only:
+            self.environment = self.run = None
+            return
+        self.environment = to_json(fingerprint())
+        runs = self.runs()
+        if resume and not runs.empty:
+            self.run = runs["Run"].iloc[-1]
+        else:
+            self.run = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+    @contextmanager
+    def connect(self):
+        # short transactions, the workers of a parallel sweep write concurrently
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def record(self, rr):
+        # append the rows of a finished cell (or of a whole JuMP run)
+        if self.read_only:
+            raise ValueError(f"the store of {self.model} is opened read-only")
+        created = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        params = to_json(self.params)
+        rows = []
+        for row in rr.to_dict(orient="records"):
+            samples = row.pop("Times", None)
+            if not isinstance(samples, list):
+                samples = None
+            rows.append(
+                (
+                    self.run,
+                    created,
+                    int(self.solve),
+                    params,
+                    self.environment,
+                    row["Language"],
+                    int(row["I"]),
+                    None if samples is None else to_json(samples),
+                    to_json(row),
+                )
+            )
+        with self.connect() as db:
+            db.executemany(
+                "INSERT INTO cells (run, created, solve, params, environment,"
+                " language, n, samples, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def select(self, columns, run=None):
+        # cells of this solve flag (and params), of one run if given
+        query = f"SELECT {columns} FROM cells WHERE solve = ?"
+        args = [int(self.solve)]
+        if self.params is not None:
+            query += " AND params = ?"
+            args.append(to_json(self.params))
+        if run is not None:
+            query += " AND run = ?"
+            args.append(run)
+        with self.connect() as db:
+            return db.execute(query + " ORDER BY id", args).fetchall()
+
+    def load(self, latest=True, run=None):
+        # result rows of one run, or of every run of the store (e.g. to compare
+        # them) if run is None; only the latest row of every (language, n)
+        # unless latest is False
+        rows = []
+        for id, run_, env, samples, result in self.select(
+            "id, run, environment, samples, result", run
+        ):
+            row = json.loads(result)
+            row["Times"] = None if samples is None else json.loads(samples)
+            row["Environment"] = env
+            row["Run"] = run_
+            row["Cell"] = id
+            rows.append(row)
+        if not rows:
+            return create_data_frame()
+
+        df = pd.DataFrame(rows)
+        if latest:
+            df = df.drop_duplicates(subset=["Language", "I"], keep="last")
+        return df.reset_index(drop=True)
+
+    def runs(self):
+        # the recorded runs in order, with their fingerprint and size
+        rows = {}
+        for run, created, params, env in self.select(
+            "run, created, params, environment"
+        ):
+            if run not in rows:
+                rows[run] = {
+                    "Run": run,
+                    "Created": created,
+                    "Params": params,
+                    "Cells": 0,
+                    "Environment": env,
+                }
+            rows[run]["Cells"] += 1
+        return pd.DataFrame(
+            list(rows.values()),
+            columns=["Run", "Created", "Params", "Cells", "Environment"],
+        )
+
+    def languages(self):
+        return set(self.load(run=self.run)["Language"])
+
+
+########## Views ##########
+def save_views(store):
+    # the pivoted CSV and the plots of everything stored for the run of store
+    df = store.load(run=store.run)
+    save_results(df, store.solve, store.model)
+    visualization.plot_results(
+        df, store.params["cardinality_of_j"], store.solve, store.model
+    )
@@ -1,10 +1,8 @@
-import pandas as pd
 import numpy as np
-import random
 import itertools
 from operator import itemgetter
 
-random.seed(13)
+from index_set import IndexSet, Labels, GroupView, group_rows, match_rows, unique_rows
 
 
 ########## Data ##########
@@ -16,74 +14,134 @@ def create_fixed_data(m):
     return J, K, L, M
 
 
-def create_variable_data(n, J, K, L, M):
-    I = [f"i{x}" for x in range(1, n + 1)]
+def sample_columns(rng, rows, size, share):
+    # share distinct columns out of size for every row
+    return np.argsort(rng.random((rows, size)), axis=1)[:, :share]
+
+
+def cover(rng, codes, size, rows):
+    # (random row, code) for every code in range(size) that is not used yet
+    unused = np.setdiff1d(np.arange(size), codes)
+    return rng.integers(rows, size=len(unused)), unused
 
-    share = int(np.ceil(len(J) * 0.05))
 
-    # IJ
-    IJ = set()
-    # draw a set of units j able to process product i
-    IJ = set([(i, j) for i in I for j in random.sample(J, share)])
-    # make sure that every unit j is able to process at least one product i
-    used_j = set([j for i, j in IJ])
-    for j in J:
-        if not j in used_j:
-            IJ.add((random.choice(I), j))
+def join_on(keys, right_keys, size):
+    # pairs of rows (left, right) with equal keys
+    return match_rows(keys, group_rows(right_keys, size))
 
+
+def create_structure(rng, nj, nk, nl, nm, share):
     # JK
-    JK = set([(j, k) for j in J for k in random.sample(K, share)])
-    # make sure that every unit j is able to process at least one product i
-    used_k = set([k for j, k in JK])
-    for k in K:
-        if not k in used_k:
-            JK.add((random.choice(J), k))
-
-    # IK
-    df_IJ = pd.DataFrame(IJ, columns=["i", "j"])
-    df_JK = pd.DataFrame(JK, columns=["j", "k"])
-    df_IJK = df_IJ.merge(right=df_JK, how="inner")
-    IJK = set(map(tuple, df_IJK.values))
-    # reduce IJK by around 50%
-    reduced_IJK = random.sample(sorted(IJK), int(np.ceil(len(IJK) * 0.5)))
-    IK = set([(i, k) for i, j, k in reduced_IJK])
-
-    # KL & LM
-    KL = set()
-    LM = set()
-    for k in K:
-        for m in M:
-            ll = random.sample(L, share)
-            for l in ll:
-                KL.add((k, l))
-                LM.add((l, m))
+    j = np.repeat(np.arange(nj), share)
+    k = sample_columns(rng, nj, nk, share).ravel()
+    # make sure that every unit k is used by at least one unit j
+    extra_j, extra_k = cover(rng, k, nk, nj)
+    JK = unique_rows(
+        np.stack([np.append(j, extra_j), np.append(k, extra_k)], 1), (nj, nk)
+    )
+
+    # KL & LM: share units l for every pair (k, m)
+    l = sample_columns(rng, nk * nm, nl, share)
+    k = np.repeat(np.repeat(np.arange(nk), nm), share)
+    m = np.repeat(np.tile(np.arange(nm), nk), share)
+    l = l.ravel()
     # does every l has a k
-    used_l = set([l for k, l in KL])
-    for l in L:
-        if not l in used_l:
-            KL.add((random.choice(K), l))
+    extra_k, extra_l = cover(rng, l, nl, nk)
+    KL = unique_rows(
+        np.stack([np.append(k, extra_k), np.append(l, extra_l)], 1), (nk, nl)
+    )
     # does every l has an m
-    used_l = set([l for l, m in LM])
-    for l in L:
-        if not l in used_l:
-            LM.add((l, random.choice(M)))
-
-    # IL, IM
-    df_KL = pd.DataFrame(KL, columns=["k", "l"])
-    df_LM = pd.DataFrame(LM, columns=["l", "m"])
-    df_IJKLM = df_IJK.merge(right=df_KL, how="inner").merge(right=df_LM, how="inner")
-    IJKLM = df_IJKLM.values.tolist()
-    IL = set([(i, l) for i, j, k, l, m in IJKLM])
-    IM = set([(i, m) for i, j, k, l, m in IJKLM])
-
-    # IKL, ILM
-    IKL = set([(i, k, l) for i, j, k, l, m in IJKLM])
-    ILM = set([(i, l, m) for i, j, k, l, m in IJKLM])
+    extra_m, extra_l = cover(rng, l, nl, nm)
+    LM = unique_rows(
+        np.stack([np.append(l, extra_l), np.append(m, extra_m)], 1), (nl, nm)
+    )
+
+    return JK, KL, LM
+
+
+def create_block(rng, start, size, structure, sizes, share, first):
+    JK, KL, LM = structure
+    nj, nk, nl, nm = sizes
+    shape = (start + size, nj, nk, nl, nm)
+
+    # IJ: draw a set of units j able to process product i
+    i = start + np.repeat(np.arange(size), share)
+    j = sample_columns(rng, size, nj, share).ravel()
+    if first:
+        # make sure that every unit j is able to process at least one product i
+        extra_i, extra_j = cover(rng, j, nj, size)
+        i, j = np.append(i, start + extra_i), np.append(j, extra_j)
+    IJ = unique_rows(np.stack([i, j], 1), shape[:2])
+
+    # IJK
+    rows, matches = join_on(IJ[:, 1], JK[:, 0], nj)
+    IJK = np.column_stack([IJ[rows], JK[matches, 1]])
+    # IK: reduce IJK by around 50%
+    reduced = rng.choice(len(IJK), int(np.ceil(len(IJK) * 0.5)), replace=False)
+    IK = unique_rows(IJK[reduced][:, [0, 2]], (shape[0], nk))
+
+    # IKL, IL
+    rows, matches = join_on(IJK[:, 2], KL[:, 0], nk)
+    IKL = unique_rows(
+        np.column_stack([IJK[rows][:, [0, 2]], KL[matches, 1]]), (shape[0], nk, nl)
+    )
+    IL = unique_rows(IKL[:, [0, 2]], (shape[0], nl))
+
+    # ILM, IM: m only depends on l, so IJKLM never has to be built
+    rows, matches = join_on(IL[:, 1], LM[:, 0], nl)
+    ILM = np.column_stack([IL[rows], LM[matches, 1]])
+    IM = unique_rows(ILM[:, [0, 2]], (shape[0], nm))
 
     # Demand
-    D = {(i, m): random.randint(0, 100) for i, m in IM}
+    D = rng.integers(0, 100, size=len(IM), endpoint=True)
+
+    return IK, IL, IM, IJK, IKL, ILM, D
+
+
+def create_variable_data(n, J, K, L, M, seed=None, block_size=50):
+    sizes = (len(J), len(K), len(L), len(M))
+    share = int(np.ceil(len(J) * 0.05))
 
-    return I, IK, IL, IM, IJK, IKL, ILM, D
+    # the products are drawn in blocks of block_size with their own random
+    # streams and trimmed to n, so every instance is a prefix of the larger
+    # ones (the first block guarantees that every unit j is used, which holds
+    # for n >= block_size)
+    blocks = -(-n // block_size)
+    streams = [
+        np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(blocks + 1)
+    ]
+
+    structure = create_structure(streams[0], *sizes, share)
+    parts = [
+        create_block(
+            streams[b + 1], b * block_size, block_size, structure, sizes, share, b == 0
+        )
+        for b in range(blocks)
+    ]
+    IK, IL, IM, IJK, IKL, ILM, D = (np.concatenate(x) for x in zip(*parts))
+
+    # drop the products of the last block beyond n
+    keep = IM[:, 0] < n
+    IM, D = IM[keep], D[keep]
+    IK, IL, IJK, IKL, ILM = (x[x[:, 0] < n] for x in (IK, IL, IJK, IKL, ILM))
+
+    labels = {
+        "i": Labels("i", n),
+        "j": Labels("j", len(J)),
+        "k": Labels("k", len(K)),
+        "l": Labels("l", len(L)),
+        "m": Labels("m", len(M)),
+    }
+
+    IK = IndexSet(("i", "k"), IK, labels)
+    IL = IndexSet(("i", "l"), IL, labels)
+    IJK = IndexSet(("i", "j", "k"), IJK, labels)
+    IKL = IndexSet(("i", "k", "l"), IKL, labels)
+    ILM = IndexSet(("i", "l", "m"), ILM, labels)
+    D = IndexSet(("i", "m"), IM, labels, D)
+    IM = IndexSet(("i", "m"), D.codes, labels)
+
+    return labels, IK, IL, IM, IJK, IKL, ILM, D
 
 
 def data_to_dicts(IK, IL, IM, IJK, IKL, ILM):
@@ -96,7 +154,9 @@ def data_to_dicts(IK, IL, IM, IJK, IKL, ILM):
     IK_IJK.update(
         {
             (i, k): list(group)
-            for (i, k), group in itertools.groupby(sorted(IJK), itemgetter(0, 2))
+            for (i, k), group in itertools.groupby(
+                sorted(IJK, key=itemgetter(0, 2)), itemgetter(0, 2)
+            )
         }
     )
     IK_IKL.update(
@@ -108,7 +168,9 @@ def data_to_dicts(IK, IL, IM, IJK, IKL, ILM):
     IL_IKL.update(
         {
             (i, l): list(group)
-            for (i, l), group in itertools.groupby(sorted(IKL), itemgetter(0, 2))
+            for (i, l), group in itertools.groupby(
+                sorted(IKL, key=itemgetter(0, 2)), itemgetter(0, 2)
+            )
         }
     )
     IL_ILM.update(
@@ -120,8 +182,21 @@ def data_to_dicts(IK, IL, IM, IJK, IKL, ILM):
     IM_ILM.update(
         {
             (i, m): list(group)
-            for (i, m), group in itertools.groupby(sorted(ILM), itemgetter(0, 2))
+            for (i, m), group in itertools.groupby(
+                sorted(ILM, key=itemgetter(0, 2)), itemgetter(0, 2)
+            )
         }
     )
 
     return IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM
+
+
+def data_to_views(IK, IL, IM, IJK, IKL, ILM):
+    # same groups as data_to_dicts, computed on the integer codes
+    IK_IJK = GroupView(IK, IJK)
+    IK_IKL = GroupView(IK, IKL)
+    IL_IKL = GroupView(IL, IKL)
+    IL_ILM = GroupView(IL, ILM)
+    IM_ILM = GroupView(IM, ILM)
+
+    return IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM
@@ -3,29 +3,34 @@ import subprocess
 import pandas as pd
 import numpy as np
 
+from gams_instance import run_gams_instance
+
 
 ########## GAMS ##########
-def data_to_gams(I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D):
+def data_to_gams(IK, IL, IM, IJK, IKL, ILM, D):
+    # one GDX per sweep with the data of the largest n, the cells restrict the
+    # model to their first n products (--N); the records are categoricals on
+    # the integer codes of the index sets, so no labels are built per row
     c = gt.Container()
+    labels = {d: x for s in (IJK, IKL, ILM) for d, x in s.labels.items()}
 
-    # create sets
-    i = c.addSet("i", records=I)
-    j = c.addSet("j", records=J)
-    k = c.addSet("k", records=K)
-    l = c.addSet("l", records=L)
-    m = c.addSet("m", records=M)
+    # create sets, i first so the order of its elements is the product order
+    i = c.addSet("i", records=labels["i"].array())
+    j = c.addSet("j", records=labels["j"].array())
+    k = c.addSet("k", records=labels["k"].array())
+    l = c.addSet("l", records=labels["l"].array())
+    m = c.addSet("m", records=labels["m"].array())
 
-    c.addSet("IK", [i, k], records=IK)
-    c.addSet("IL", [i, l], records=IL)
-    c.addSet("IM", [i, m], records=IM)
-    c.addSet("IJK", [i, j, k], records=IJK)
-    c.addSet("IKL", [i, k, l], records=IKL)
-    c.addSet("ILM", [i, l, m], records=ILM)
+    c.addSet("IK", [i, k], records=IK.to_frame())
+    c.addSet("IL", [i, l], records=IL.to_frame())
+    c.addSet("IM", [i, m], records=IM.to_frame())
+    c.addSet("IJK", [i, j, k], records=IJK.to_frame())
+    c.addSet("IKL", [i, k, l], records=IKL.to_frame())
+    c.addSet("ILM", [i, l, m], records=ILM.to_frame())
 
     # create parameter
     c.addParameter("time")
-    df_d = pd.DataFrame([(i, m, D[i, m]) for i, m in IM], columns=["i", "m", "value"])
-    c.addParameter("d", [i, m], records=df_d)
+    c.addParameter("d", [i, m], records=D.to_frame())
 
     # create variables
     c.addVariable("f")
@@ -36,23 +41,18 @@ def data_to_gams(I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D):
     c.write("supply_chain/data/data.gdx")
 
 
-def run_gams(I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D, solve, N, repeats, number):
-    data_to_gams(
-        I=I, J=J, K=K, L=L, M=M, IK=IK, IL=IL, IM=IM, IJK=IJK, IKL=IKL, ILM=ILM, D=D
-    )
-
+def run_gams(I, solve, repeats, number):
+    # the GDX of the sweep has to be written already (data_to_gams)
+    command = [
+        "gams",
+        "supply_chain/supply_chain.gms",
+        f"--N={len(I)}",
+        f"--R={repeats}",
+        f"--evals={number}",
+    ]
     if solve:
-        subprocess.call(
-            f"gams supply_chain/supply_chain.gms --solve={solve} --R={repeats} --N={number}",
-            stderr=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-        )
-    else:
-        subprocess.call(
-            f"gams supply_chain/supply_chain.gms --R={repeats} --N={number}",
-            stderr=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-        )
+        command.append(f"--solve={solve}")
+    subprocess.call(command, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
 
     c = gt.Container()
     c.read("supply_chain/results/result.gdx")
@@ -60,7 +60,7 @@ def run_gams(I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D, solve, N, repeats, num
 
     result = pd.DataFrame(
         {
-            "I": [N],
+            "I": [len(I)],
             "Language": ["GAMS"],
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
@@ -69,3 +69,16 @@ def run_gams(I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D, solve, N, repeats, num
     )
 
     return result
+
+
+def run_persistent_gams(I, solve, repeats, number):
+    # the model is compiled and the GDX of the sweep loaded once per process
+    return run_gams_instance(
+        "supply_chain/supply_chain.gms",
+        "supply_chain/data/data.gdx",
+        "mi minimizing f using lp",
+        len(I),
+        solve,
+        repeats,
+        number,
+    )
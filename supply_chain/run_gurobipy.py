@@ -1,8 +1,11 @@
-import timeit
+import timing
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import gurobipy as gpy
 
+from index_set import composite_keys
+
 
 ########## Gurobi ##########
 def run_gurobi(I, ik, il, im, ijk, ikl, ilm, D, solve, repeats, number):
@@ -26,7 +29,7 @@ def run_gurobi(I, ik, il, im, ijk, ikl, ilm, D, solve, repeats, number):
         "solve": solve,
         "model_function": gurobi,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(IK, IL, IM, IJK, IKL, ILM, D, solve)",
         repeat=repeats,
         number=number,
@@ -40,6 +43,7 @@ def run_gurobi(I, ik, il, im, ijk, ikl, ilm, D, solve, repeats, number):
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -48,35 +52,39 @@ def run_gurobi(I, ik, il, im, ijk, ikl, ilm, D, solve, repeats, number):
 def gurobi(IK, IL, IM, IJK, IKL, ILM, d, solve):
     model = gpy.Model()
 
-    x = model.addVars(IJK, name="x")
-    y = model.addVars(IKL, name="y")
-    z = model.addVars(ILM, name="z")
+    with timing.phase("variables"):
+        x = model.addVars(IJK, name="x")
+        y = model.addVars(IKL, name="y")
+        z = model.addVars(ILM, name="z")
 
-    model.setObjective(1, gpy.GRB.MINIMIZE)
+    with timing.phase("constraints"):
+        model.setObjective(1, gpy.GRB.MINIMIZE)
 
-    model.addConstrs(
-        gpy.quicksum(x[i, j, k] for (i, j, k) in IJK.select(i, "*", k))
-        >= gpy.quicksum(y[i, k, l] for (i, k, l) in IKL.select(i, k, "*"))
-        for (i, k) in IK
-    )
+        model.addConstrs(
+            gpy.quicksum(x[i, j, k] for (i, j, k) in IJK.select(i, "*", k))
+            >= gpy.quicksum(y[i, k, l] for (i, k, l) in IKL.select(i, k, "*"))
+            for (i, k) in IK
+        )
 
-    model.addConstrs(
-        gpy.quicksum(y[i, k, l] for (i, k, l) in IKL.select(i, "*", l))
-        >= gpy.quicksum(z[i, l, m] for (i, l, m) in ILM.select(i, l, "*"))
-        for (i, l) in IL
-    )
+        model.addConstrs(
+            gpy.quicksum(y[i, k, l] for (i, k, l) in IKL.select(i, "*", l))
+            >= gpy.quicksum(z[i, l, m] for (i, l, m) in ILM.select(i, l, "*"))
+            for (i, l) in IL
+        )
 
-    model.addConstrs(
-        gpy.quicksum(z[i, l, m] for (i, l, m) in ILM.select(i, "*", m)) >= d[i, m]
-        for (i, m) in IM
-    )
+        model.addConstrs(
+            gpy.quicksum(z[i, l, m] for (i, l, m) in ILM.select(i, "*", m)) >= d[i, m]
+            for (i, m) in IM
+        )
 
-    model.update()
+    with timing.phase("writer"):
+        model.update()
 
     if solve:
-        model.Params.OutputFlag = 0
-        model.Params.TimeLimit = 0
-        model.optimize()
+        with timing.phase("solver"):
+            model.Params.OutputFlag = 0
+            model.Params.TimeLimit = 0
+            model.optimize()
 
 
 ########## Fast Gurobi ##########
@@ -122,7 +130,7 @@ def run_fast_gurobi(
         "solve": solve,
         "model_function": fast_gurobi,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve)",
         repeat=repeats,
         number=number,
@@ -136,6 +144,7 @@ def run_fast_gurobi(
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -144,32 +153,118 @@ def run_fast_gurobi(
 def fast_gurobi(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, d, solve):
     model = gpy.Model()
 
-    x = model.addVars(IJK, name="x")
-    y = model.addVars(IKL, name="y")
-    z = model.addVars(ILM, name="z")
+    with timing.phase("variables"):
+        x = model.addVars(IJK, name="x")
+        y = model.addVars(IKL, name="y")
+        z = model.addVars(ILM, name="z")
+
+    with timing.phase("constraints"):
+        model.setObjective(1, gpy.GRB.MINIMIZE)
+
+        model.addConstrs(
+            gpy.quicksum(x[ijk] for ijk in IK_IJK[i, k])
+            >= gpy.quicksum(y[ikl] for ikl in IK_IKL[i, k])
+            for (i, k) in IK
+        )
+
+        model.addConstrs(
+            gpy.quicksum(y[ikl] for ikl in IL_IKL[i, l])
+            >= gpy.quicksum(z[ilm] for ilm in IL_ILM[i, l])
+            for (i, l) in IL
+        )
+
+        model.addConstrs(
+            gpy.quicksum(z[ilm] for ilm in IM_ILM[i,m]) >= d[i, m]
+            for (i, m) in IM
+        )
+
+    with timing.phase("writer"):
+        model.update()
+
+    if solve:
+        with timing.phase("solver"):
+            model.Params.OutputFlag = 0
+            model.Params.TimeLimit = 0
+            model.optimize()
 
-    model.setObjective(1, gpy.GRB.MINIMIZE)
 
-    model.addConstrs(
-        gpy.quicksum(x[ijk] for ijk in IK_IJK[i, k])
-        >= gpy.quicksum(y[ikl] for ikl in IK_IKL[i, k])
-        for (i, k) in IK
+########## Matrix Gurobi ##########
+def run_matrix_gurobi(I, IK, IL, IM, IJK, IKL, ILM, D, solve, repeats, number):
+    # the sets are IndexSets, D holds the demand of the rows of IM
+    setup = {
+        "IK": IK,
+        "IL": IL,
+        "IM": IM,
+        "IJK": IJK,
+        "IKL": IKL,
+        "ILM": ILM,
+        "D": D,
+        "solve": solve,
+        "model_function": matrix_gurobi,
+    }
+    r, phases = timing.repeat(
+        "model_function(IK, IL, IM, IJK, IKL, ILM, D, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
     )
 
-    model.addConstrs(
-        gpy.quicksum(y[ikl] for ikl in IL_IKL[i, l])
-        >= gpy.quicksum(z[ilm] for ilm in IL_ILM[i, l])
-        for (i, l) in IL
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Matrix GurobiPy"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
     )
+    return result
+
 
-    model.addConstrs(
-        gpy.quicksum(z[ilm] for ilm in IM_ILM[i,m]) >= d[i, m]
-        for (i, m) in IM
+def incidence(rows, columns):
+    # A[r, c] = 1 if column c matches row r on the dims of rows
+    keys = composite_keys(rows, rows.dims)
+    order = np.argsort(keys)
+    column_keys = composite_keys(columns, rows.dims)
+    position = np.searchsorted(keys, column_keys, sorter=order)
+    position = order[np.minimum(position, len(keys) - 1)]
+    found = np.flatnonzero(keys[position] == column_keys)
+    return sp.csr_matrix(
+        (np.ones(len(found)), (position[found], found)),
+        shape=(len(rows), len(columns)),
     )
 
-    model.update()
+
+def matrix_gurobi(IK, IL, IM, IJK, IKL, ILM, d, solve):
+    model = gpy.Model()
+
+    with timing.phase("variables"):
+        x = model.addMVar(len(IJK), name="x")
+        y = model.addMVar(len(IKL), name="y")
+        z = model.addMVar(len(ILM), name="z")
+
+    with timing.phase("constraints"):
+        model.setObjective(1, gpy.GRB.MINIMIZE)
+
+        # one row per (i, k), (i, l) and (i, m) over the columns x, y, z
+        A = sp.bmat(
+            [
+                [incidence(IK, IJK), -incidence(IK, IKL), None],
+                [None, incidence(IL, IKL), -incidence(IL, ILM)],
+                [None, None, incidence(IM, ILM)],
+            ],
+            format="csr",
+        )
+        b = np.concatenate([np.zeros(len(IK) + len(IL)), d.values])
+
+        model.addMConstr(A, gpy.hstack((x, y, z)), gpy.GRB.GREATER_EQUAL, b)
+
+    with timing.phase("writer"):
+        model.update()
 
     if solve:
-        model.Params.OutputFlag = 0
-        model.Params.TimeLimit = 0
-        model.optimize()
+        with timing.phase("solver"):
+            model.Params.OutputFlag = 0
+            model.Params.TimeLimit = 0
+            model.optimize()
@@ -3,11 +3,13 @@ import json
 import pandas as pd
 import os
 
+from jump_worker import run_jump_cell
+
 
 ########## JuMP ##########
-def run_julia(solve, repeats, number, time_limit):
+def run_julia(solve, repeats, number, time_limit, data_format="json"):
     subprocess.call(
-        f"julia supply_chain/supply_chain.jl {solve} {repeats} {number} {time_limit}"
+        f"julia supply_chain/supply_chain.jl {solve} {repeats} {number} {time_limit} {data_format}"
     )
     print("\nJulia done")
 
@@ -27,4 +29,36 @@ def run_julia(solve, repeats, number, time_limit):
 
     with open(file2, "r") as f:
         df2 = pd.DataFrame(json.load(f))
+
+    # JuMP runs alone after the sweep
+    df["Concurrency"] = 1
+    df2["Concurrency"] = 1
     return df, df2
+
+
+########## JuMP Worker ##########
+def run_fast_jump(I, solve, repeats, number, data_format="bin", sysimage=None):
+    # one cell in the persistent julia worker, interleaved with the python cells
+    return run_jump_cell(
+        "supply_chain/supply_chain.jl",
+        "Fast JuMP",
+        len(I),
+        solve,
+        repeats,
+        number,
+        data_format,
+        sysimage,
+    )
+
+
+def run_jump(I, solve, repeats, number, data_format="bin", sysimage=None):
+    return run_jump_cell(
+        "supply_chain/supply_chain.jl",
+        "JuMP",
+        len(I),
+        solve,
+        repeats,
+        number,
+        data_format,
+        sysimage,
+    )
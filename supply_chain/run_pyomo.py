@@ -1,11 +1,36 @@
 import pyomo.environ as pyo
+import pyomo.kernel as pmo
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+from pyomo.core.expr.numeric_expr import LinearExpression
 import logging
-import timeit
+import timing
 import pandas as pd
 import numpy as np
 
 logging.getLogger("pyomo.core").setLevel(logging.ERROR)
 
+# where the solver interfaces write the LP file or build the solver model
+WRITER = ("_presolve", "set_instance")
+
+
+########## Solvers ##########
+def solver_interface(solver):
+    return timing.timed_method(pyo.SolverFactory(solver), WRITER, "writer")
+
+
+def solve_model(model, solver="gurobi", opt=None):
+    # solve with a new interface of solver, or with opt, a persistent
+    # interface created once per cell and reused by every repeat
+    with timing.phase("solver"):
+        if opt is None:
+            opt = solver_interface(solver)
+        if isinstance(opt, PersistentSolver):
+            # build the gurobipy model in memory, no LP file
+            opt.set_instance(model)
+            opt.solve(options={"TimeLimit": 0}, load_solutions=False)
+        else:
+            opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+
 
 ########## Pyomo ##########
 def run_pyomo(I, IK, IL, IM, IJK, IKL, ILM, D, solve, repeats, number):
@@ -20,7 +45,7 @@ def run_pyomo(I, IK, IL, IM, IJK, IKL, ILM, D, solve, repeats, number):
         "solve": solve,
         "model_function": pyomo,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(IK, IL, IM, IJK, IKL, ILM, D, solve)",
         repeat=repeats,
         number=number,
@@ -34,6 +59,7 @@ def run_pyomo(I, IK, IL, IM, IJK, IKL, ILM, D, solve, repeats, number):
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -42,31 +68,33 @@ def run_pyomo(I, IK, IL, IM, IJK, IKL, ILM, D, solve, repeats, number):
 def pyomo(IK, IL, IM, IJK, IKL, ILM, D, solve):
     model = pyo.ConcreteModel()
 
-    model.IK = pyo.Set(initialize=IK)
-    model.IL = pyo.Set(initialize=IL)
-    model.IM = pyo.Set(initialize=IM)
-    model.IJK = pyo.Set(initialize=IJK)
-    model.IKL = pyo.Set(initialize=IKL)
-    model.ILM = pyo.Set(initialize=ILM)
+    with timing.phase("data"):
+        model.IK = pyo.Set(initialize=IK)
+        model.IL = pyo.Set(initialize=IL)
+        model.IM = pyo.Set(initialize=IM)
+        model.IJK = pyo.Set(initialize=IJK)
+        model.IKL = pyo.Set(initialize=IKL)
+        model.ILM = pyo.Set(initialize=ILM)
 
-    model.f = pyo.Param(default=1)
-    model.d = pyo.Param(model.IM, initialize=D)
+        model.f = pyo.Param(default=1)
+        model.d = pyo.Param(model.IM, initialize=D)
 
-    model.x = pyo.Var(model.IJK, domain=pyo.NonNegativeReals)
-    model.y = pyo.Var(model.IKL, domain=pyo.NonNegativeReals)
-    model.z = pyo.Var(model.ILM, domain=pyo.NonNegativeReals)
+    with timing.phase("variables"):
+        model.x = pyo.Var(model.IJK, domain=pyo.NonNegativeReals)
+        model.y = pyo.Var(model.IKL, domain=pyo.NonNegativeReals)
+        model.z = pyo.Var(model.ILM, domain=pyo.NonNegativeReals)
 
-    model.OBJ = pyo.Objective(expr=model.f)
+    with timing.phase("constraints"):
+        model.OBJ = pyo.Objective(expr=model.f)
 
-    model.production = pyo.Constraint(model.IK, rule=production_rule)
-    model.transport = pyo.Constraint(model.IL, rule=transport_rule)
-    model.demand = pyo.Constraint(model.IM, rule=demand_rule)
+        model.production = pyo.Constraint(model.IK, rule=production_rule)
+        model.transport = pyo.Constraint(model.IL, rule=transport_rule)
+        model.demand = pyo.Constraint(model.IM, rule=demand_rule)
 
     # model.write("int.lp")
 
     if solve:
-        opt = pyo.SolverFactory("gurobi")
-        opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+        solve_model(model)
 
 
 def production_rule(model, i, k):
@@ -123,7 +151,7 @@ def run_fast_pyomo(
         "solve": solve,
         "model_function": fast_pyomo,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve)",
         repeat=repeats,
         number=number,
@@ -137,45 +165,73 @@ def run_fast_pyomo(
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
 
 
-def fast_pyomo(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve):
+def fast_pyomo(
+    IK,
+    IL,
+    IM,
+    IJK,
+    IKL,
+    ILM,
+    IK_IJK,
+    IK_IKL,
+    IL_IKL,
+    IL_ILM,
+    IM_ILM,
+    D,
+    solve,
+    solver="gurobi",
+    opt=None,
+):
     model = pyo.ConcreteModel()
 
-    model.IK = pyo.Set(initialize=IK)
-    model.IL = pyo.Set(initialize=IL)
-    model.IM = pyo.Set(initialize=IM)
-    model.IJK = pyo.Set(initialize=IJK)
-    model.IKL = pyo.Set(initialize=IKL)
-    model.ILM = pyo.Set(initialize=ILM)
+    build_fast_pyomo(
+        model, IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D
+    )
 
-    model.IK_IJK = pyo.Set(IK_IJK.keys(), initialize=IK_IJK)
-    model.IK_IKL = pyo.Set(IK_IKL.keys(), initialize=IK_IKL)
-    model.IL_IKL = pyo.Set(IL_IKL.keys(), initialize=IL_IKL)
-    model.IL_ILM = pyo.Set(IL_ILM.keys(), initialize=IL_ILM)
-    model.IM_ILM = pyo.Set(IM_ILM.keys(), initialize=IM_ILM)
+    with timing.phase("constraints"):
+        model.production = pyo.Constraint(model.IK, rule=fast_production_rule)
+        model.transport = pyo.Constraint(model.IL, rule=fast_transport_rule)
+        model.demand = pyo.Constraint(model.IM, rule=fast_demand_rule)
 
-    model.f = pyo.Param(default=1)
-    model.d = pyo.Param(model.IM, initialize=D)
+    # model.write("int.lp")
 
-    model.x = pyo.Var(model.IJK, domain=pyo.NonNegativeReals)
-    model.y = pyo.Var(model.IKL, domain=pyo.NonNegativeReals)
-    model.z = pyo.Var(model.ILM, domain=pyo.NonNegativeReals)
+    if solve:
+        solve_model(model, solver, opt)
 
-    model.OBJ = pyo.Objective(expr=model.f)
 
-    model.production = pyo.Constraint(model.IK, rule=fast_production_rule)
-    model.transport = pyo.Constraint(model.IL, rule=fast_transport_rule)
-    model.demand = pyo.Constraint(model.IM, rule=fast_demand_rule)
+def build_fast_pyomo(
+    model, IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D
+):
+    with timing.phase("data"):
+        model.IK = pyo.Set(initialize=IK)
+        model.IL = pyo.Set(initialize=IL)
+        model.IM = pyo.Set(initialize=IM)
+        model.IJK = pyo.Set(initialize=IJK)
+        model.IKL = pyo.Set(initialize=IKL)
+        model.ILM = pyo.Set(initialize=ILM)
 
-    # model.write("int.lp")
+        model.IK_IJK = pyo.Set(IK_IJK.keys(), initialize=IK_IJK)
+        model.IK_IKL = pyo.Set(IK_IKL.keys(), initialize=IK_IKL)
+        model.IL_IKL = pyo.Set(IL_IKL.keys(), initialize=IL_IKL)
+        model.IL_ILM = pyo.Set(IL_ILM.keys(), initialize=IL_ILM)
+        model.IM_ILM = pyo.Set(IM_ILM.keys(), initialize=IM_ILM)
 
-    if solve:
-        opt = pyo.SolverFactory("gurobi")
-        opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+        model.f = pyo.Param(default=1)
+        model.d = pyo.Param(model.IM, initialize=D)
+
+    with timing.phase("variables"):
+        model.x = pyo.Var(model.IJK, domain=pyo.NonNegativeReals)
+        model.y = pyo.Var(model.IKL, domain=pyo.NonNegativeReals)
+        model.z = pyo.Var(model.ILM, domain=pyo.NonNegativeReals)
+
+    with timing.phase("constraints"):
+        model.OBJ = pyo.Objective(expr=model.f)
 
 
 def fast_production_rule(model, i, k):
@@ -194,6 +250,301 @@ def fast_demand_rule(model, i, m):
     return sum(model.z[ilm] for ilm in model.IM_ILM[i, m]) >= model.d[i, m]
 
 
+########## Kernel Pyomo ##########
+def run_kernel_pyomo(
+    I,
+    IK,
+    IL,
+    IM,
+    IJK,
+    IKL,
+    ILM,
+    IK_IJK,
+    IK_IKL,
+    IL_IKL,
+    IL_ILM,
+    IM_ILM,
+    D,
+    solve,
+    repeats,
+    number,
+):
+    setup = {
+        "IK": IK,
+        "IL": IL,
+        "IM": IM,
+        "IJK": IJK,
+        "IKL": IKL,
+        "ILM": ILM,
+        "IK_IJK": IK_IJK,
+        "IK_IKL": IK_IKL,
+        "IL_IKL": IL_IKL,
+        "IL_ILM": IL_ILM,
+        "IM_ILM": IM_ILM,
+        "D": D,
+        "solve": solve,
+        "model_function": kernel_pyomo,
+    }
+    r, phases = timing.repeat(
+        "model_function(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
+
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Kernel Pyomo"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
+    )
+    return result
+
+
+def kernel_pyomo(
+    IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve
+):
+    # pyomo.kernel model with linear constraints given by their coefficients,
+    # so no expressions are generated; solved without the LP writer
+    model = pmo.block()
+
+    with timing.phase("variables"):
+        model.x = pmo.variable_dict((ijk, pmo.variable(lb=0)) for ijk in IJK)
+        model.y = pmo.variable_dict((ikl, pmo.variable(lb=0)) for ikl in IKL)
+        model.z = pmo.variable_dict((ilm, pmo.variable(lb=0)) for ilm in ILM)
+
+    with timing.phase("constraints"):
+        model.OBJ = pmo.objective(1)
+
+        model.production = pmo.constraint_dict(
+            (ik, balance(model.x, IK_IJK[ik], model.y, IK_IKL[ik])) for ik in IK
+        )
+        model.transport = pmo.constraint_dict(
+            (il, balance(model.y, IL_IKL[il], model.z, IL_ILM[il])) for il in IL
+        )
+        model.demand = pmo.constraint_dict(
+            (
+                im,
+                pmo.linear_constraint(
+                    variables=[model.z[ilm] for ilm in IM_ILM[im]],
+                    coefficients=[1] * len(IM_ILM[im]),
+                    lb=D[im],
+                ),
+            )
+            for im in IM
+        )
+
+    if solve:
+        solve_model(model, "gurobi_direct")
+
+
+def balance(a, a_index, b, b_index):
+    # sum(a) - sum(b) >= 0
+    return pmo.linear_constraint(
+        variables=[a[idx] for idx in a_index] + [b[idx] for idx in b_index],
+        coefficients=[1] * len(a_index) + [-1] * len(b_index),
+        lb=0,
+    )
+
+
+########## Linear Pyomo ##########
+def run_linear_pyomo(
+    I,
+    IK,
+    IL,
+    IM,
+    IJK,
+    IKL,
+    ILM,
+    IK_IJK,
+    IK_IKL,
+    IL_IKL,
+    IL_ILM,
+    IM_ILM,
+    D,
+    solve,
+    repeats,
+    number,
+):
+    setup = {
+        "IK": IK,
+        "IL": IL,
+        "IM": IM,
+        "IJK": IJK,
+        "IKL": IKL,
+        "ILM": ILM,
+        "IK_IJK": IK_IJK,
+        "IK_IKL": IK_IKL,
+        "IL_IKL": IL_IKL,
+        "IL_ILM": IL_ILM,
+        "IM_ILM": IM_ILM,
+        "D": D,
+        "solve": solve,
+        "model_function": linear_pyomo,
+    }
+    r, phases = timing.repeat(
+        "model_function(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
+
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Linear Pyomo"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
+    )
+    return result
+
+
+def linear_pyomo(
+    IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve
+):
+    # same model as fast_pyomo, with LinearExpression rules and the appsi
+    # interface instead of the LP writer
+    model = pyo.ConcreteModel()
+
+    build_fast_pyomo(
+        model, IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D
+    )
+
+    with timing.phase("constraints"):
+        model.production = pyo.Constraint(model.IK, rule=linear_production_rule)
+        model.transport = pyo.Constraint(model.IL, rule=linear_transport_rule)
+        model.demand = pyo.Constraint(model.IM, rule=linear_demand_rule)
+
+    if solve:
+        solve_model(model, "appsi_gurobi")
+
+
+def linear_balance(a, b):
+    return LinearExpression(
+        constant=0,
+        linear_coefs=[1] * len(a) + [-1] * len(b),
+        linear_vars=a + b,
+    )
+
+
+def linear_production_rule(model, i, k):
+    return (
+        linear_balance(
+            [model.x[ijk] for ijk in model.IK_IJK[i, k]],
+            [model.y[ikl] for ikl in model.IK_IKL[i, k]],
+        )
+        >= 0
+    )
+
+
+def linear_transport_rule(model, i, l):
+    return (
+        linear_balance(
+            [model.y[ikl] for ikl in model.IL_IKL[i, l]],
+            [model.z[ilm] for ilm in model.IL_ILM[i, l]],
+        )
+        >= 0
+    )
+
+
+def linear_demand_rule(model, i, m):
+    z = [model.z[ilm] for ilm in model.IM_ILM[i, m]]
+    return linear_balance(z, []) >= model.d[i, m]
+
+
+########## Persistent Pyomo ##########
+def run_persistent_pyomo(
+    I,
+    IK,
+    IL,
+    IM,
+    IJK,
+    IKL,
+    ILM,
+    IK_IJK,
+    IK_IKL,
+    IL_IKL,
+    IL_ILM,
+    IM_ILM,
+    D,
+    solve,
+    repeats,
+    number,
+    reuse=False,
+):
+    # reuse: one persistent interface for all repeats of the cell
+    setup = {
+        "IK": IK,
+        "IL": IL,
+        "IM": IM,
+        "IJK": IJK,
+        "IKL": IKL,
+        "ILM": ILM,
+        "IK_IJK": IK_IJK,
+        "IK_IKL": IK_IKL,
+        "IL_IKL": IL_IKL,
+        "IL_ILM": IL_ILM,
+        "IM_ILM": IM_ILM,
+        "D": D,
+        "solve": solve,
+        "opt": solver_interface("gurobi_persistent") if solve and reuse else None,
+        "model_function": persistent_pyomo,
+    }
+    r, phases = timing.repeat(
+        "model_function(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve, opt)",
+        repeat=repeats,
+        number=number,
+        globals=setup,
+    )
+
+    result = pd.DataFrame(
+        {
+            "I": [len(I)],
+            "Language": ["Reused Persistent Pyomo" if reuse else "Persistent Pyomo"],
+            "MinTime": [np.min(r)],
+            "MeanTime": [np.mean(r)],
+            "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
+        }
+    )
+    return result
+
+
+def run_reused_pyomo(*args, **kwargs):
+    return run_persistent_pyomo(*args, **kwargs, reuse=True)
+
+
+def persistent_pyomo(
+    IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D, solve, opt
+):
+    # fast_pyomo handed to gurobi in memory by the persistent interface instead
+    # of through an LP file and the gurobi shell
+    fast_pyomo(
+        IK,
+        IL,
+        IM,
+        IJK,
+        IKL,
+        ILM,
+        IK_IJK,
+        IK_IKL,
+        IL_IKL,
+        IL_ILM,
+        IM_ILM,
+        D,
+        solve,
+        solver="gurobi_persistent",
+        opt=opt,
+    )
+
+
 ########## Cartesian Pyomo ##########
 def run_cartesian_pyomo(
     I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D, solve, repeats, number
@@ -214,7 +565,7 @@ def run_cartesian_pyomo(
         "solve": solve,
         "model_function": cartesian_pyomo,
     }
-    r = timeit.repeat(
+    r, phases = timing.repeat(
         "model_function(I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D, solve)",
         repeat=repeats,
         number=number,
@@ -228,6 +579,7 @@ def run_cartesian_pyomo(
             "MinTime": [np.min(r)],
             "MeanTime": [np.mean(r)],
             "MedianTime": [np.median(r)],
+            **timing.sample_columns(r, phases),
         }
     )
     return result
@@ -241,28 +593,30 @@ def cartesian_pyomo(I, J, K, L, M, IK, IL, IM, IJK, IKL, ILM, D, solve):
     model.K = pyo.Set(initialize=K)
     model.L = pyo.Set(initialize=L)
     model.M = pyo.Set(initialize=M)
-    model.IK = pyo.Set(initialize=IK)
-    model.IL = pyo.Set(initialize=IL)
-    model.IM = pyo.Set(initialize=IM)
-    model.IJK = pyo.Set(initialize=IJK)
-    model.IKL = pyo.Set(initialize=IKL)
-    model.ILM = pyo.Set(initialize=ILM)
+    with timing.phase("data"):
+        model.IK = pyo.Set(initialize=IK)
+        model.IL = pyo.Set(initialize=IL)
+        model.IM = pyo.Set(initialize=IM)
+        model.IJK = pyo.Set(initialize=IJK)
+        model.IKL = pyo.Set(initialize=IKL)
+        model.ILM = pyo.Set(initialize=ILM)
 
-    model.f = pyo.Param(default=1)
-    model.d = pyo.Param(model.IM, initialize=D)
+        model.f = pyo.Param(default=1)
+        model.d = pyo.Param(model.IM, initialize=D)
 
-    model.x = pyo.Var(model.I, model.J, model.K, domain=pyo.NonNegativeReals)
-    model.y = pyo.Var(model.I, model.K, model.L, domain=pyo.NonNegativeReals)
-    model.z = pyo.Var(model.I, model.L, model.M, domain=pyo.NonNegativeReals)
+    with timing.phase("variables"):
+        model.x = pyo.Var(model.I, model.J, model.K, domain=pyo.NonNegativeReals)
+        model.y = pyo.Var(model.I, model.K, model.L, domain=pyo.NonNegativeReals)
+        model.z = pyo.Var(model.I, model.L, model.M, domain=pyo.NonNegativeReals)
 
-    model.OBJ = pyo.Objective(expr=model.f)
+    with timing.phase("constraints"):
+        model.OBJ = pyo.Objective(expr=model.f)
 
-    model.production = pyo.Constraint(model.IK, rule=production_rule)
-    model.transport = pyo.Constraint(model.IL, rule=transport_rule)
-    model.demand = pyo.Constraint(model.IM, rule=demand_rule)
+        model.production = pyo.Constraint(model.IK, rule=production_rule)
+        model.transport = pyo.Constraint(model.IL, rule=transport_rule)
+        model.demand = pyo.Constraint(model.IM, rule=demand_rule)
 
     # model.write("int.lp")
 
     if solve:
-        opt = pyo.SolverFactory("gurobi")
-        opt.solve(model, options={"TimeLimit": 0}, load_solutions=False)
+        solve_model(model)
@@ -13,15 +13,45 @@ function read_fixed_data()
     return N
 end
 
-function read_variable_data(n)
-    IK = read_tuple_list("supply_chain/data/data_IK_$n.json")
-    IL = read_tuple_list("supply_chain/data/data_IL_$n.json")
-    IM = read_tuple_list("supply_chain/data/data_IM_$n.json")
-    IJK = read_tuple_list("supply_chain/data/data_IJK_$n.json")
-    IKL = read_tuple_list("supply_chain/data/data_IKL_$n.json")
-    ILM = read_tuple_list("supply_chain/data/data_ILM_$n.json")
-    d = read_tuple_list("supply_chain/data/data_D_$n.json")
-    D = Dict((i, m) => value for (i, m, value) in d)
+function read_column_list(filename)
+    # little-endian int32 columns written by help.save_to_columns
+    meta = JSON.parsefile("$filename.meta.json")
+    rows = meta["rows"]
+    dims = meta["dims"]
+    codes = Vector{Int32}(undef, rows * length(dims))
+    read!("$filename.bin", codes)
+    codes = reshape(ltoh.(codes), rows, length(dims))
+    labels = [
+        ["$(meta["labels"][d][1])$x" for x in 1:meta["labels"][d][2]] for d in dims
+    ]
+    return [Tuple(labels[c][codes[r, c]+1] for c in eachindex(dims)) for r in 1:rows]
+end
+
+function read_column_values(filename)
+    values = Vector{Float64}(undef, JSON.parsefile("$filename.meta.json")["rows"])
+    read!("$filename.values.bin", values)
+    return ltoh.(values)
+end
+
+function read_variable_data(n, format)
+    if format == "bin"
+        read_symbol = name -> read_column_list("supply_chain/data/data_$(name)_$n")
+    else
+        read_symbol = name -> read_tuple_list("supply_chain/data/data_$(name)_$n.json")
+    end
+    IK = read_symbol("IK")
+    IL = read_symbol("IL")
+    IM = read_symbol("IM")
+    IJK = read_symbol("IJK")
+    IKL = read_symbol("IKL")
+    ILM = read_symbol("ILM")
+    if format == "bin"
+        values = read_column_values("supply_chain/data/data_D_$n")
+        D = Dict(im => value for (im, value) in zip(read_symbol("D"), values))
+    else
+        d = read_symbol("D")
+        D = Dict((i, m) => value for (i, m, value) in d)
+    end
     return IK, IL, IM, IJK, IKL, ILM, D
 end
 
@@ -133,52 +163,82 @@ function fast_jump(IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM
     end
 end
 
+# worker mode: one cell per command of the python driver, see jump_worker.jl
+include(joinpath(@__DIR__, "..", "jump_worker.jl"))
+
+# data of the last n, the JuMP cells of an n follow each other
+loaded = Dict{String,Any}()
+
+function run_cell(command)
+    n, format, solve = command["n"], command["format"], command["solve"]
+    if get(loaded, "key", nothing) != (n, format)
+        IK, IL, IM, IJK, IKL, ILM, D = read_variable_data(n, format)
+        IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM = convert_to_DF(IJK, IKL, ILM)
+        loaded["key"] = (n, format)
+        loaded["Fast JuMP"] = (IK, IL, IM, IJK, IKL, ILM, IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM, D)
+        loaded["JuMP"] = (IK, IL, IM, IJK, IKL, ILM, D)
+    end
+    f = command["language"] == "Fast JuMP" ? fast_jump : jump
+    return benchmark_cell(
+        command["language"], n, solve, command["samples"], command["evals"],
+        f, loaded[command["language"]]..., solve,
+    )
+end
+
 # solve = false
 # samples = 2
 # evals = 1
 # time_limit = 5
+# format = "json"
 
-solve = ARGS[1]
-samples = parse(Int64, ARGS[2])
-evals = parse(Int64, ARGS[3])
-time_limit = parse(Int64, ARGS[4])
-
-N = read_fixed_data()
-
-t = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[])
-tt = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[])
-
-for n in N
-    IK, IL, IM, IJK, IKL, ILM, D = read_variable_data(n)
-    IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM = convert_to_DF(IJK, IKL, ILM)
-
-    if maximum(t.MinTime; init=0) < time_limit
-        r = @benchmark fast_jump($IK, $IL, $IM, $IJK, $IKL, $ILM, $IK_IJK, $IK_IKL, $IL_IKL, $IL_ILM, $IM_ILM, $D, $solve) samples = samples evals = evals
-        push!(t, (n, "Fast JuMP", minimum(r.times) / 1e9, mean(r.times) / 1e9, median(r.times) / 1e9))
-        println("Fast JuMP done $n in $(round(minimum(r.times) / 1e9, digits=2))s")
+if length(ARGS) >= 1 && ARGS[1] == "worker"
+    serve(run_cell)
+else
+    solve = ARGS[1]
+    samples = parse(Int64, ARGS[2])
+    evals = parse(Int64, ARGS[3])
+    time_limit = parse(Int64, ARGS[4])
+    format = length(ARGS) >= 5 ? ARGS[5] : "json"
+
+    N = read_fixed_data()
+
+    # peak RSS of the julia process so far and memory allocated per evaluation (MiB),
+    # and the raw samples (s)
+    t = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[], ProcessPeakMemory=Float64[], AllocatedMemory=Float64[], Times=Vector{Float64}[])
+    tt = DataFrame(I=Int[], Language=String[], MinTime=Float64[], MeanTime=Float64[], MedianTime=Float64[], ProcessPeakMemory=Float64[], AllocatedMemory=Float64[], Times=Vector{Float64}[])
+
+    for n in N
+        IK, IL, IM, IJK, IKL, ILM, D = read_variable_data(n, format)
+        IK_IJK, IK_IKL, IL_IKL, IL_ILM, IM_ILM = convert_to_DF(IJK, IKL, ILM)
+
+        if maximum(t.MinTime; init=0) < time_limit
+            r = @benchmark fast_jump($IK, $IL, $IM, $IJK, $IKL, $ILM, $IK_IJK, $IK_IKL, $IL_IKL, $IL_ILM, $IM_ILM, $D, $solve) samples = samples evals = evals
+            push!(t, (n, "Fast JuMP", minimum(r.times) / 1e9, mean(r.times) / 1e9, median(r.times) / 1e9, Sys.maxrss() / 2^20, r.memory / 2^20, r.times / 1e9))
+            println("Fast JuMP done $n in $(round(minimum(r.times) / 1e9, digits=2))s")
+        end
+
+        if maximum(tt.MinTime; init=0) < time_limit
+            rr = @benchmark jump($IK, $IL, $IM, $IJK, $IKL, $ILM, $D, $solve) samples = samples evals = evals
+            push!(tt, (n, "JuMP", minimum(rr.times) / 1e9, mean(rr.times) / 1e9, median(rr.times) / 1e9, Sys.maxrss() / 2^20, rr.memory / 2^20, rr.times / 1e9))
+            println("JuMP done $n in $(round(minimum(rr.times) / 1e9, digits=2))s")
+        end
     end
 
-    if maximum(tt.MinTime; init=0) < time_limit
-        rr = @benchmark jump($IK, $IL, $IM, $IJK, $IKL, $ILM, $D, $solve) samples = samples evals = evals
-        push!(tt, (n, "JuMP", minimum(rr.times) / 1e9, mean(rr.times) / 1e9, median(rr.times) / 1e9))
-        println("JuMP done $n in $(round(minimum(rr.times) / 1e9, digits=2))s")
+    if solve == "True"
+        file = "supply_chain/results/fast_jump_results_solve.json"
+        file2 = "supply_chain/results/jump_results_solve.json"
+    else
+        file = "supply_chain/results/fast_jump_results_model.json"
+        file2 = "supply_chain/results/jump_results_model.json"
     end
-end
 
-if solve == "True"
-    file = "supply_chain/results/fast_jump_results_solve.json"
-    file2 = "supply_chain/results/jump_results_solve.json"
-else
-    file = "supply_chain/results/fast_jump_results_model.json"
-    file2 = "supply_chain/results/jump_results_model.json"
-end
+    open(file, "w") do f
+        JSON.print(f, t, 4)
+    end
 
-open(file, "w") do f
-    JSON.print(f, t, 4)
-end
+    open(file2, "w") do f
+        JSON.print(f, tt, 4)
+    end
 
-open(file2, "w") do f
-    JSON.print(f, tt, 4)
+    println("JuMP done")
 end
-
-println("JuMP done")
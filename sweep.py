@@ -0,0 +1,345 @@
+import os
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+import timing
+from memory import MEMORY_COLUMNS, measure, run_measured
+from help import (
+    create_data_frame,
+    below_time_limit,
+    censored_result,
+    process_results,
+    print_log_message,
+)
+
+
+########## Instances ##########
+class Instance(dict):
+    # inputs of one n; missing entries are derived from the rules on first use,
+    # so every representation is built at most once and only if a backend needs it
+    def __init__(self, rules, **values):
+        super().__init__(values)
+        self.rules = rules
+
+    def __missing__(self, key):
+        value = self[key] = self.rules[key](self)
+        return value
+
+
+########## Cells ##########
+def run_cell(backend, instance, solve, repeats, number, concurrency, options, source):
+    # source: (instances, N, n), how a fresh process finds the instance again
+    if options["isolate"]:
+        rr = run_isolated(backend, source, solve, repeats, number, options)
+    else:
+        run_function, inputs = backend
+        # derive the inputs here, so the instance keeps them for the next backends
+        args = [instance[x] for x in inputs]
+
+        def run():
+            return run_function(*args, solve, repeats=repeats, number=number)
+
+        def traced():
+            # a single execution for the allocation trace, after the timed ones
+            return run_function(*args, solve, repeats=1, number=1)
+
+        if options["memory"]:
+            rr = run_measured(run, options["trace"], traced)
+        else:
+            rr = run()
+    rr["Concurrency"] = concurrency
+    return rr
+
+
+def cell_options(language, options):
+    # external backends measure themselves in their own long-lived process, a
+    # forked or spawned python process would start a new one for every cell
+    if language in options["external"]:
+        return dict(options, memory=False, isolate=False)
+    return options
+
+
+def complete_cell(language, n, df, time_limit, margin, store, done, run):
+    # the stored result of the cell when resuming (done: rows of the run of
+    # the store, measured or predicted), the prediction if it is skipped, or a
+    # new run; new results are recorded in the store right away
+    if done is not None:
+        rr = done[(done["Language"] == language) & (done["I"] == n)]
+        if not rr.empty:
+            return rr
+    rr = censored_result(df, language, n, time_limit, margin)
+    if rr is None:
+        rr = run()
+    if store is not None:
+        store.record(rr)
+    return rr
+
+
+########## Isolation ##########
+def run_repetition(backend, source, solve, number, options):
+    # runs in a fresh interpreter: load the instance (memory-mapped from the
+    # cache), derive the inputs and time a single repetition
+    instances, N, n = source
+    timing.collect = options["gc"]
+    # every repetition is a single sample, combine_repetitions adds them up
+    timing.sampling = None
+    instance = next(instance for m, instance in instances(N) if m == n)
+
+    run_function, inputs = backend
+    args = [instance[x] for x in inputs]
+
+    def run():
+        return run_function(*args, solve, repeats=1, number=number)
+
+    def traced():
+        return run_function(*args, solve, repeats=1, number=1)
+
+    return measure(run, options["trace"], traced) if options["memory"] else run()
+
+
+def run_isolated(backend, source, solve, repeats, number, options):
+    # every repetition in its own process, so no run inherits the heap, the
+    # garbage or the data of another one (first-use costs of the modelling
+    # libraries are part of every repetition then)
+    ctx = multiprocessing.get_context("spawn")
+    frames = []
+    for _ in range(repeats):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+            future = executor.submit(
+                run_repetition, backend, source, solve, number, options
+            )
+            frames.append(future.result())
+    return combine_repetitions(frames)
+
+
+def combine_repetitions(frames):
+    # one row like a run with several repeats: the phases of the fastest
+    # repetition, the statistics over all of them and the largest peak memory
+    df = pd.concat(frames).reset_index(drop=True)
+    rr = df.loc[[df["MinTime"].idxmin()]].copy()
+    rr["MeanTime"] = df["MinTime"].mean()
+    rr["MedianTime"] = df["MinTime"].median()
+    rr["CILower"], rr["CIUpper"] = timing.confidence_interval(df["MinTime"])
+    rr["Samples"] = len(df)
+    rr["Times"] = pd.Series([sum(df["Times"], [])], index=rr.index)
+    for column in MEMORY_COLUMNS:
+        if column in df:
+            rr[column] = df[column].max()
+    return rr
+
+
+########## Serial ##########
+def run_serial(
+    N, backends, instances, time_limit, solve, repeats, number, export, options
+):
+    frames = {language: create_data_frame() for language in backends}
+
+    for n, instance in instances(N):
+        if export is not None:
+            export(n, instance)
+
+        for language, backend in backends.items():
+            if below_time_limit(frames[language], time_limit):
+                rr = complete_cell(
+                    language,
+                    n,
+                    frames[language],
+                    time_limit,
+                    options["margin"],
+                    options["store"],
+                    options["done"],
+                    partial(
+                        run_cell,
+                        backend,
+                        instance,
+                        solve,
+                        repeats,
+                        number,
+                        1,
+                        cell_options(language, options),
+                        (instances, N, n),
+                    ),
+                )
+                frames[language] = process_results(rr, frames[language])
+                print_log_message(language=language, n=n, df=frames[language])
+
+    return frames
+
+
+########## Parallel ##########
+active = None
+
+
+def init_worker(counter, cpus):
+    global active
+    active = counter
+
+    # pin the worker to its own cpu
+    if cpus is not None:
+        os.sched_setaffinity(0, {cpus.get()})
+
+
+def run_chain(
+    language, backend, N, instances, time_limit, solve, repeats, number, options
+):
+    # the sizes of one backend run in order to keep the time limit semantics
+    df = create_data_frame()
+
+    with active.get_lock():
+        active.value += 1
+    try:
+        with timing.settings(collect=options["gc"], sampling=options["sampling"]):
+            for n, instance in instances(N):
+                if not below_time_limit(df, time_limit):
+                    break
+                rr = complete_cell(
+                    language,
+                    n,
+                    df,
+                    time_limit,
+                    options["margin"],
+                    options["store"],
+                    options["done"],
+                    partial(
+                        run_cell,
+                        backend,
+                        instance,
+                        solve,
+                        repeats,
+                        number,
+                        active.value,
+                        cell_options(language, options),
+                        (instances, N, n),
+                    ),
+                )
+                df = process_results(rr, df)
+                print_log_message(language=language, n=n, df=df)
+    finally:
+        with active.get_lock():
+            active.value -= 1
+
+    return df
+
+
+def run_parallel(
+    N,
+    backends,
+    instances,
+    time_limit,
+    solve,
+    repeats,
+    number,
+    export,
+    max_workers,
+    cpus,
+    options,
+):
+    if export is not None:
+        for n, instance in instances(N):
+            export(n, instance)
+
+    ctx = multiprocessing.get_context()
+    counter = ctx.Value("i", 0)
+    if cpus is not None:
+        queue = ctx.Queue()
+        for cpu in cpus:
+            queue.put(cpu)
+        max_workers = min(max_workers or len(cpus), len(cpus))
+    else:
+        queue = None
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=ctx,
+        initializer=init_worker,
+        initargs=(counter, queue),
+    ) as executor:
+        futures = {
+            language: executor.submit(
+                run_chain,
+                language,
+                backend,
+                N,
+                instances,
+                time_limit,
+                solve,
+                repeats,
+                number,
+                options,
+            )
+            for language, backend in backends.items()
+        }
+        return {language: future.result() for language, future in futures.items()}
+
+
+########## Sweep ##########
+def run_sweep(
+    N,
+    backends,
+    instances,
+    time_limit,
+    solve,
+    repeats,
+    number,
+    export=None,
+    parallel=False,
+    max_workers=None,
+    cpus=None,
+    memory=False,
+    trace=0,
+    isolate=False,
+    gc=False,
+    sampling=None,
+    margin=1.5,
+    store=None,
+    resume=False,
+    external=(),
+):
+    # backends: {language: (run_function, names of the instance inputs)}
+    # instances: picklable callable yielding (n, Instance) for the sizes in N
+    # memory: run every cell in a forked child that records its peak RSS, and
+    # the trace top tracemalloc allocators of it
+    # isolate: run every repetition in a fresh interpreter, which loads its
+    # instance from the cache (instances should use it)
+    # gc: keep the garbage collector enabled while timing the Python backends
+    # sampling: adaptive sampling of the Python backends (see timing.adaptive)
+    # instead of repeats and number, not used by isolated repetitions
+    # margin: skip a cell whose time, extrapolated from the last cells of the
+    # backend, exceeds margin * time_limit and record the prediction instead
+    # (None runs every cell up to the first one over the limit)
+    # store: ResultStore that records every cell as it completes; with resume,
+    # the cells already in its run are taken from it instead of being run again
+    # external: languages running in a persistent process of their own (the
+    # JuMP worker), called in the sweep process even with memory or isolate,
+    # they report the memory of their own process
+    options = {
+        "memory": memory,
+        "trace": trace,
+        "isolate": isolate,
+        "gc": gc,
+        "sampling": sampling,
+        "margin": margin,
+        "store": store,
+        "external": set(external),
+        "done": store.load(run=store.run) if store is not None and resume else None,
+    }
+    with timing.settings(collect=gc, sampling=sampling):
+        if parallel:
+            return run_parallel(
+                N,
+                backends,
+                instances,
+                time_limit,
+                solve,
+                repeats,
+                number,
+                export,
+                max_workers,
+                cpus,
+                options,
+            )
+        return run_serial(
+            N, backends, instances, time_limit, solve, repeats, number, export, options
+        )
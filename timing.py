@@ -0,0 +1,180 @@
+import sys
+import time
+import gc
+import timeit
+import functools
+from contextlib import contextmanager
+import numpy as np
+
+########## Phases ##########
+PHASES = ("data", "variables", "constraints", "writer", "solver")
+
+
+def phase_column(phase):
+    return f"{phase.capitalize()}Time"
+
+
+PHASE_COLUMNS = tuple(phase_column(p) for p in PHASES)
+
+# phase -> seconds of the running repetition, None outside of repeat()
+record = None
+# time spent in the nested phases of every open phase
+stack = []
+# timeit switches the garbage collector off while timing, unless this is set
+collect = False
+# called at the end of every phase, only set for untimed runs (memory.measure)
+phase_end = None
+
+
+@contextmanager
+def phase(name):
+    # time a phase of a builder, the phases nested in it are not counted twice
+    if record is None:
+        yield
+        return
+    nested = [0.0]
+    stack.append(nested)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1][0] += elapsed
+        record[name] = record.get(name, 0.0) + elapsed - nested[0]
+        if phase_end is not None:
+            phase_end()
+
+
+def timed_method(obj, methods, name):
+    # record every call of the given methods of obj (if it has them) as phase name
+    for method in methods:
+        function = getattr(obj, method, None)
+        if function is not None:
+            setattr(obj, method, timed(function, name))
+    return obj
+
+
+def timed(function, name):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+########## Measurements ##########
+# adaptive sampling instead of the fixed repeats and number of the runners, e.g.
+# {"target": 0.05, "budget": 60}, see adaptive() for the keys
+sampling = None
+
+# raw times of the samples (per execution) in Times
+SAMPLE_COLUMNS = ("CILower", "CIUpper", "Samples", "Number", "Times")
+
+
+@contextmanager
+def settings(**values):
+    # set module options (collect, sampling), e.g. for a sweep, and restore the
+    # previous values afterwards, so later runners do not inherit them
+    module = sys.modules[__name__]
+    previous = {key: getattr(module, key) for key in values}
+    for key, value in values.items():
+        setattr(module, key, value)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            setattr(module, key, value)
+
+
+def repeat(stmt, repeat, number, globals):
+    # timeit.repeat that also returns the phases recorded in every repetition,
+    # both per execution of stmt
+    timer = timeit.Timer(stmt, gc.enable if collect else "pass", globals=globals)
+    if sampling is not None:
+        return adaptive(timer, **sampling)
+    times = []
+    records = []
+    for _ in range(repeat):
+        t, r = measure(timer, number)
+        times.append(t)
+        records.append(r)
+    return times, records
+
+
+def measure(timer, number):
+    # one sample of number executions: time and phases per execution
+    global record
+    record = {}
+    try:
+        total = timer.timeit(number)
+        r = {p: t / number for p, t in record.items()}
+        r["number"] = number
+        return total / number, r
+    finally:
+        record = None
+        stack.clear()
+
+
+def adaptive(
+    timer, target=0.05, budget=60.0, min_time=0.05, min_samples=3, max_samples=100
+):
+    # sample until the relative half-width of the confidence interval of the
+    # mean is below target, or until the next sample would exceed the budget
+    # (seconds per cell); there is always at least one sample
+    start = time.perf_counter()
+    t, r = measure(timer, 1)
+    if t < min_time:
+        # time several executions per sample for tiny cells, this first run
+        # only calibrates number
+        number = int(min(np.ceil(min_time / max(t, 1e-7)), 1e6))
+        times, records = [], []
+    else:
+        number = 1
+        times, records = [t], [r]
+
+    while len(times) < max_samples:
+        if times:
+            if len(times) >= min_samples and relative_half_width(times) <= target:
+                break
+            spent = time.perf_counter() - start
+            if spent + np.mean(times) * number > budget:
+                break
+        t, r = measure(timer, number)
+        times.append(t)
+        records.append(r)
+    return times, records
+
+
+def confidence_interval(times, level=0.95):
+    # t-interval of the mean time
+    from scipy import stats
+
+    n = len(times)
+    if n < 2:
+        return np.nan, np.nan
+    mean = np.mean(times)
+    half = stats.t.ppf((1 + level) / 2, n - 1) * np.std(times, ddof=1) / np.sqrt(n)
+    return mean - half, mean + half
+
+
+def relative_half_width(times):
+    low, high = confidence_interval(times)
+    return (high - low) / 2 / np.mean(times)
+
+
+def sample_columns(times, records):
+    # confidence interval and sample counts, and the phases of the fastest
+    # sample (the one reported as MinTime)
+    low, high = confidence_interval(times)
+    best = records[int(np.argmin(times))]
+    return {
+        "CILower": [low],
+        "CIUpper": [high],
+        "Samples": [len(times)],
+        "Number": [best["number"]],
+        "Times": [list(times)],
+        **{phase_column(p): [best.get(p, np.nan)] for p in PHASES},
+    }
@@ -1,6 +1,8 @@
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+from help import is_censored
+
 
 def plot_results(df, cardinality_of_j, solve, model):
     # Apply the default theme
@@ -18,10 +20,31 @@ def plot_results(df, cardinality_of_j, solve, model):
         filename = f"model_performance.png"
         y_label = f"Model Generation Time [s]"
 
-    # Plot
+    # Plot, the predicted times of skipped cells as crosses
+    censored = df[is_censored(df)]
+    df = df[~is_censored(df)]
+    languages = list(df["Language"].unique())
     plot = sns.relplot(
-        data=df, x="I", y="MinTime", hue="Language", kind="line", palette="muted"
+        data=df,
+        x="I",
+        y="MinTime",
+        hue="Language",
+        hue_order=languages,
+        kind="line",
+        palette="muted",
     )
+    if not censored.empty:
+        sns.scatterplot(
+            data=censored,
+            x="I",
+            y="MinTime",
+            hue="Language",
+            hue_order=languages,
+            palette="muted",
+            marker="X",
+            legend=False,
+            ax=plot.ax,
+        )
 
     plot.fig.suptitle(
         r"$|\mathcal{J}|, |\mathcal{K}|, |\mathcal{L}|, |\mathcal{M}| = $"
@@ -33,3 +56,45 @@ def plot_results(df, cardinality_of_j, solve, model):
     plot.set(xlabel=r"$|\mathcal{I}|$", ylabel=y_label)
 
     plt.savefig(f"plots/{model}/{filename}", dpi=300)
+
+    plot_memory(df, cardinality_of_j, solve, model)
+
+
+def plot_memory(df, cardinality_of_j, solve, model):
+    # peak RSS of every cell over its start, only for runs that measured it;
+    # the start holds the inputs the earlier backends derived, so the peak
+    # itself depends on the order of the backends
+    if "CellMemory" not in df or df["CellMemory"].isna().all():
+        return
+
+    sns.set_theme(
+        style="ticks",
+        rc={
+            "figure.dpi": 100,
+        },
+    )
+
+    if solve:
+        filename = f"solve_memory.png"
+    else:
+        filename = f"model_memory.png"
+
+    plot = sns.relplot(
+        data=df.dropna(subset=["CellMemory"]),
+        x="I",
+        y="CellMemory",
+        hue="Language",
+        kind="line",
+        palette="muted",
+    )
+
+    plot.fig.suptitle(
+        r"$|\mathcal{J}|, |\mathcal{K}|, |\mathcal{L}|, |\mathcal{M}| = $"
+        + f"{cardinality_of_j}",
+        size=15,
+    )
+    plot.fig.subplots_adjust(top=0.85)
+
+    plot.set(xlabel=r"$|\mathcal{I}|$", ylabel="Peak Memory of the Cell [MiB]")
+
+    plt.savefig(f"plots/{model}/{filename}", dpi=300)